@@ -0,0 +1,170 @@
+import asyncio
+import json
+import logging
+from typing import Any
+from urllib.parse import urlencode
+
+from sirius.core.background import BackgroundTasks
+from sirius.core.request import Request
+from sirius.core.response import (
+    Response,
+    StreamingResponse,
+    get_header,
+    method_not_allowed,
+)
+from sirius.core.serialization import JSON
+from sirius.errors import BatchError
+
+logger = logging.getLogger(__name__)
+
+# Headers describing the body of the batch request itself, which sub-requests don't have
+BODY_HEADERS = frozenset({b"content-length", b"content-type", b"transfer-encoding"})
+
+NO_BODY = {"type": "http.request", "body": b"", "more_body": False}
+
+
+def parse_items(body: bytes, max_items: int) -> list[tuple[str, str, bytes]]:
+    """Validate a batch body into `(method, path, query string)` triples."""
+    try:
+        items = json.loads(body)
+    except ValueError as e:
+        raise BatchError("The batch must be a JSON list") from e
+    if not isinstance(items, list):
+        raise BatchError("The batch must be a JSON list")
+    if len(items) > max_items:
+        raise BatchError(f"A batch can't hold more than {max_items} requests")
+
+    parsed = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get("path"), str):
+            raise BatchError(f"Request {index} must be an object with a path")
+        method = item.get("method", "GET")
+        query = item.get("query", "")
+        if isinstance(query, dict):
+            query = urlencode(query, doseq=True)
+        if not isinstance(method, str) or not isinstance(query, str):
+            raise BatchError(f"Request {index} has an invalid method or query")
+        parsed.append((method.upper(), item["path"], query.encode("utf-8")))
+    return parsed
+
+
+class Batch:
+    """
+    Answers a list of GET-style sub-requests in a single round trip.
+
+    The endpoint takes a `POST` with a JSON list of `{"method", "path", "query"}` objects, `query`
+    being a query string or a mapping, and resolves each through the router like a request of its
+    own, sharing the caches, limits and coalescing of the routes. At most `max_concurrency`
+    sub-requests are handled at once. The response is a JSON list holding the `status`, headers and
+    body of each sub-request, in order; JSON bodies are embedded as is and others, including
+    invalid JSON ones, as text.
+
+    Sub-requests carry the headers of the batch request, apart from its body ones, and no body.
+    A failing sub-request gets a 500 item without affecting the others. Background tasks of
+    sub-requests join those of the batch request, to run once the batch response has been sent.
+    """
+
+    def __init__(
+        self,
+        app,
+        path: str,
+        max_concurrency: int = 10,
+        max_items: int = 100,
+    ) -> None:
+        self.app = app
+        self.path = path
+        self.max_concurrency = max_concurrency
+        self.max_items = max_items
+        self.not_allowed = method_not_allowed(["post"])
+
+    async def __call__(self, request: Request) -> Response:
+        if request.method != "POST":
+            return self.not_allowed
+        try:
+            items = parse_items(await request.body(), self.max_items)
+        except BatchError as e:
+            return self.app.router.serializer((str(e), 400))
+
+        headers = [
+            (key, value)
+            for key, value in request.asgi_scope.get("headers", ())
+            if key.lower() not in BODY_HEADERS
+        ]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results = await asyncio.gather(
+            *(self.resolve(item, headers, semaphore, request) for item in items)
+        )
+        return self.app.router.serializer(results)
+
+    async def resolve(
+        self,
+        item: tuple[str, str, bytes],
+        headers: list[tuple[bytes, bytes]],
+        semaphore: asyncio.Semaphore,
+        batch: Request,
+    ) -> dict[str, Any]:
+        method, path, query = item
+        request = Request(
+            {
+                "type": "http",
+                "method": method,
+                "path": path,
+                "query_string": query,
+                "headers": headers,
+            },
+            NO_BODY,
+        )
+        async with semaphore:
+            try:
+                response = await self.app.router.route(
+                    method.lower(), path, query, request
+                )
+                body = await self.read(response)
+            except Exception:
+                logger.exception("Batched request %s %s failed", method, path)
+                return {"status": 500, "headers": {}, "body": None}
+            finally:
+                request.finish()
+        if request.background:
+            if batch.background is None:
+                batch.background = BackgroundTasks()
+            for function, args, kwargs in request.background:
+                batch.background.add(function, *args, **kwargs)
+
+        return {
+            "status": response.start.status,
+            "headers": {
+                key.decode("latin-1"): value.decode("latin-1")
+                for key, value in response.start.headers
+            },
+            "body": self.decode(response, body),
+        }
+
+    async def read(self, response: Response) -> bytes:
+        if not isinstance(response, StreamingResponse):
+            return response.body.body
+        stream = response.stream
+        try:
+            chunks = [
+                chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+                async for chunk in self.app._iterate(stream, response.executor)
+            ]
+        finally:
+            if hasattr(stream, "aclose"):
+                await stream.aclose()
+            elif hasattr(stream, "close"):
+                stream.close()
+        return b"".join(chunks)
+
+    @staticmethod
+    def decode(response: Response, body: bytes) -> Any:
+        if not body:
+            return None
+        content_type = get_header(response.start.headers, b"Content-Type") or b""
+        if content_type.startswith(JSON):
+            try:
+                return json.loads(body)
+            except ValueError:
+                # Mislabelled bodies are passed on as text, like any other
+                pass
+        return body.decode("utf-8", "replace")
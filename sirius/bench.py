@@ -0,0 +1,231 @@
+import asyncio
+import gc
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from sirius import __version__
+from sirius.config.config import Cfg, MetricsConfig
+from sirius.sirius import Sirius
+
+SIZES = (10, 100, 1000)
+SMALL_BODY = 64
+LARGE_BODY = 1024 * 1024
+BODY_CHUNK = 64 * 1024
+
+# Route modules every benchmarked tree contains, next to the synthetic ones
+SCENARIO_ROUTES = {
+    "bench/json.py": (
+        "async def get():\n"
+        "    return {'items': [{'id': i, 'name': f'item {i}', 'tags': ['a', 'b']}"
+        " for i in range(50)]}\n"
+    ),
+    "bench/query.py": (
+        "async def get(q: str, page: int = 1, tags: list[str] = []):\n"
+        "    return 'ok'\n"
+    ),
+    "bench/echo.py": (
+        "from sirius.core import Request\n\n"
+        "async def post(request: Request):\n"
+        "    return str(len(await request.body()))\n"
+    ),
+}
+
+# Scenario name -> (method, path, query string, body size)
+SCENARIOS = {
+    "hit_static": ("GET", "/s{i}", b"", 0),
+    "hit_param": ("GET", "/p{i}/{i}", b"", 0),
+    "miss": ("GET", "/missing/{i}", b"", 0),
+    "query": ("GET", "/bench/query", b"q=sirius&page=2&tags=a&tags=b%20c", 0),
+    "json": ("GET", "/bench/json", b"", 0),
+    "body_small": ("POST", "/bench/echo", b"", SMALL_BODY),
+    "body_large": ("POST", "/bench/echo", b"", LARGE_BODY),
+}
+
+
+def build_tree(root: Path, size: int) -> Path:
+    """
+    Write a synthetic `src/routes` tree of `size` routes under `root`.
+
+    Half the routes are static (`/s<n>`) and half take a path param (`/p<n>/<id>`), so lookups
+    exercise both kinds of trie edges.
+    """
+    routes = root / "src" / "routes"
+    routes.mkdir(parents=True)
+    (root / "src" / "__init__.py").touch()
+    for i in range(size):
+        if i % 2:
+            route = routes / f"p{i}" / "<id>.py"
+            route.parent.mkdir()
+            route.write_text("async def get(id: int):\n    return str(id)\n")
+        else:
+            (routes / f"s{i}.py").write_text("async def get():\n    return 'ok'\n")
+    for name, source in SCENARIO_ROUTES.items():
+        route = routes / name
+        route.parent.mkdir(parents=True, exist_ok=True)
+        route.write_text(source)
+    return routes
+
+
+@contextmanager
+def project(size: int) -> Iterator[Path]:
+    """Run inside a temporary project holding a synthetic route tree."""
+    cwd = Path.cwd()
+    with tempfile.TemporaryDirectory(prefix="sirius-bench-") as directory:
+        root = Path(directory)
+        build_tree(root, size)
+        os.chdir(root)
+        sys.path.insert(0, directory)
+        try:
+            yield root
+        finally:
+            os.chdir(cwd)
+            sys.path.remove(directory)
+            for name in [name for name in sys.modules if name.split(".")[0] == "src"]:
+                del sys.modules[name]
+
+
+def scope(method: str, path: str, query: bytes, body_size: int) -> dict:
+    headers = [(b"host", b"bench")]
+    if body_size:
+        headers.append((b"content-length", str(body_size).encode("latin-1")))
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query,
+        "root_path": "",
+        "headers": headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 8000),
+    }
+
+
+def body_messages(size: int) -> list[dict]:
+    if not size:
+        return [{"type": "http.request", "body": b"", "more_body": False}]
+    chunk = b"x" * min(size, BODY_CHUNK)
+    count = -(-size // len(chunk))
+    return [
+        {"type": "http.request", "body": chunk, "more_body": i < count - 1}
+        for i in range(count)
+    ]
+
+
+async def request(app, scope: dict, messages: list[dict]) -> int:
+    """Drive `app` through one request with a fake `receive`/`send`, returning the status."""
+    pending = iter(messages)
+    status = 0
+
+    async def receive() -> dict:
+        message = next(pending, None)
+        if message is None:
+            # Like a server would, only report a disconnect once the request is over
+            await asyncio.Event().wait()
+        return message
+
+    async def send(message: dict) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+def percentile(latencies: list[int], fraction: float) -> float:
+    return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))]
+
+
+async def run_scenario(app, name: str, size: int, requests: int) -> dict:
+    method, path, query, body_size = SCENARIOS[name]
+    paths = [path]
+    if "{i}" in path:
+        # Static routes have even numbers, param routes odd ones
+        first = 0 if name == "hit_static" else 1
+        paths = [path.format(i=i) for i in range(first, max(size, first + 1), 2)]
+    scopes = [scope(method, path, query, body_size) for path in paths]
+    messages = body_messages(body_size)
+
+    for i in range(min(100, requests)):
+        await request(app, scopes[i % len(scopes)], messages)
+
+    latencies = []
+    statuses: dict[int, int] = {}
+    gc.collect()
+    started = time.perf_counter_ns()
+    for i in range(requests):
+        begin = time.perf_counter_ns()
+        status = await request(app, scopes[i % len(scopes)], messages)
+        latencies.append(time.perf_counter_ns() - begin)
+        statuses[status] = statuses.get(status, 0) + 1
+    elapsed = time.perf_counter_ns() - started
+
+    # Allocations are measured on a separate, shorter run, tracing slows everything down
+    sampled = min(requests, 200)
+    tracemalloc.start()
+    peaks = 0
+    blocks = sys.getallocatedblocks()
+    for i in range(sampled):
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        await request(app, scopes[i % len(scopes)], messages)
+        peaks += tracemalloc.get_traced_memory()[1] - current
+    retained = sys.getallocatedblocks() - blocks
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "routes": size,
+        "scenario": name,
+        "requests": requests,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "requests_per_second": round(requests / (elapsed / 1e9), 1),
+        "p50_us": round(percentile(latencies, 0.50) / 1e3, 2),
+        "p99_us": round(percentile(latencies, 0.99) / 1e3, 2),
+        "peak_allocated_bytes": peaks // sampled if sampled else 0,
+        "retained_blocks": retained // sampled if sampled else 0,
+    }
+
+
+def run(
+    sizes: tuple[int, ...] = SIZES,
+    scenarios: tuple[str, ...] = tuple(SCENARIOS),
+    requests: int = 5000,
+    config: Cfg | None = None,
+) -> dict:
+    """
+    Benchmark the request pipeline of `Sirius.__call__` over synthetic route trees.
+
+    Each scenario of `SCENARIOS` is run `requests` times against a tree of each of the `sizes`,
+    in process and without a server or sockets. Latencies are wall clock times of a whole
+    request, allocations are the peak traced memory of a request and the memory blocks it leaves
+    behind, both averaged over a sample of requests.
+    """
+    # Metrics are left out by default, so they don't skew the numbers of what they measure
+    config = config or Cfg(metrics=MetricsConfig(enabled=False))
+    results = []
+    for size in sizes:
+        with project(size):
+            app = Sirius(config=config)
+            try:
+                for name in scenarios:
+                    results.append(asyncio.run(run_scenario(app, name, size, requests)))
+            finally:
+                app.executor.shutdown()
+    return {
+        "sirius": __version__,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "results": results,
+    }
@@ -1,13 +1,18 @@
+import json
+import sys
 from pathlib import Path
 from typing import Optional
 
 import attr
 import click
-import uvicorn
 
-from sirius import __version__
+from sirius import __version__, bench as benchmarks
 from sirius.config.config import DEFAULT_CONFIG_FILE_PATH, update_config, get_config
 from sirius.config.export import export_default_config
+from sirius.routing import Router
+from sirius.routing.manifest import write_manifest
+from sirius.reload import run_dev
+from sirius.server import serve as serve_workers
 
 
 def parse_config(
@@ -42,7 +47,7 @@ def parse_config(
 )
 @click.version_option(version=__version__)
 @click.pass_context
-def main(ctx: click.Context, config: str, verbose: bool) -> None:
+def main(ctx: click.Context, config: str) -> None:
     ...
 
 
@@ -64,8 +69,93 @@ def export(ctx: click.Context, file_name: str) -> None:
     export_default_config(Path(file_name))
 
 
+@main.command()
+@click.option(
+    "-o",
+    "--output",
+    help="File to write the route manifest to",
+    type=click.Path(dir_okay=False, writable=True, path_type=str),
+)
+@click.pass_context
+def build(ctx: click.Context, output: Optional[str]) -> None:
+    routing = get_config().user.routing
+    # Route modules are imported relative to the project root, like the server does
+    sys.path.insert(0, str(Path.cwd()))
+    router = Router(routing.path)
+    file = write_manifest(router, Path(output or routing.manifest))
+    print(
+        f"Wrote {len(router.module_paths)} routes to {file}.",
+        file=sys.stderr,
+    )
+
+
 @main.command()
 @click.option("-p", "--port", help="Port to run the server on", type=int)
 @click.pass_context
-def dev(ctx: click.Context, port: int) -> None:
-    uvicorn.run("sirius.sirius:sirius", port=port, reload=True)
+def dev(ctx: click.Context, port: Optional[int]) -> None:
+    run_dev(
+        port or get_config().user.dev.port,
+        config_file=str(ctx.parent.params["config"]),
+    )
+
+
+@main.command()
+@click.option("-H", "--host", help="Address to bind the server to", type=str)
+@click.option("-p", "--port", help="Port to bind the server to", type=int)
+@click.option("-w", "--workers", help="Number of worker processes", type=int)
+@click.pass_context
+def serve(
+    ctx: click.Context,
+    host: Optional[str],
+    port: Optional[int],
+    workers: Optional[int],
+) -> None:
+    server = get_config().user.server
+    overrides = {"host": host, "port": port, "workers": workers}
+    server = attr.evolve(
+        server, **{key: value for key, value in overrides.items() if value is not None}
+    )
+    serve_workers(server, config_file=str(ctx.parent.params["config"]))
+
+
+@main.command()
+@click.option("-n", "--requests", help="Requests per scenario", type=int, default=5000)
+@click.option(
+    "-s",
+    "--size",
+    "sizes",
+    help="Number of routes in the benchmarked tree, can be repeated",
+    type=int,
+    multiple=True,
+)
+@click.option(
+    "--scenario",
+    "scenarios",
+    help="Scenario to run, can be repeated",
+    type=click.Choice(list(benchmarks.SCENARIOS)),
+    multiple=True,
+)
+@click.option(
+    "-o",
+    "--output",
+    help="File to write the JSON results to, instead of stdout",
+    type=click.Path(dir_okay=False, writable=True, path_type=str),
+)
+@click.pass_context
+def bench(
+    ctx: click.Context,
+    requests: int,
+    sizes: tuple[int, ...],
+    scenarios: tuple[str, ...],
+    output: Optional[str],
+) -> None:
+    results = benchmarks.run(
+        sizes=sizes or benchmarks.SIZES,
+        scenarios=scenarios or tuple(benchmarks.SCENARIOS),
+        requests=requests,
+    )
+    text = json.dumps(results, indent=2)
+    if output:
+        Path(output).write_text(text + "\n")
+    else:
+        print(text)
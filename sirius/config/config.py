@@ -7,6 +7,7 @@ import attr
 import desert
 import marshmallow
 
+from sirius.core.compression import DEFAULT_CONTENT_TYPES
 from sirius.errors import CfgLoadError
 
 DEFAULT_CONFIG_FILENAME = "sirius.toml"
@@ -45,11 +46,414 @@ class DeveloperConfig:
     )
 
 
+@attr.s(auto_attribs=True, slots=True)
+class ServerConfig:
+    """Sirius production server configurations."""
+
+    host: str = attr.ib(
+        default="127.0.0.1",
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Address to bind the server to.",
+            )
+        },
+    )
+    port: int = attr.ib(
+        default=8000,
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Port to bind the server to.",
+            )
+        },
+    )
+    workers: int = attr.ib(
+        default=0,
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Number of worker processes, 0 starts one per CPU.",
+            )
+        },
+    )
+    backlog: int = attr.ib(
+        default=2048,
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Maximum number of pending connections on the listening socket.",
+            )
+        },
+    )
+    keep_alive: int = attr.ib(
+        default=5,
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Seconds to keep idle keep-alive connections open.",
+            )
+        },
+    )
+    graceful_timeout: int = attr.ib(
+        default=30,
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Seconds workers get to finish in-flight requests on shutdown.",
+            )
+        },
+    )
+
+
+@attr.s(auto_attribs=True, slots=True)
+class RoutingConfig:
+    """Sirius routing configurations."""
+
+    path: str = attr.ib(
+        default="src/routes",
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Folder containing the route modules, relative to the working directory.",
+            )
+        },
+    )
+    lazy: bool = attr.ib(
+        default=False,
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Import route modules on their first request instead of at startup.",
+            )
+        },
+    )
+    warm_up: bool = attr.ib(
+        default=False,
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="With lazy routes, import them on a background thread after startup.",
+            )
+        },
+    )
+    manifest: str = attr.ib(
+        default="sirius-routes.json",
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Route manifest written by `sirius build` and read at startup when up to date.",
+            )
+        },
+    )
+
+
+@attr.s(auto_attribs=True, slots=True)
+class ExecutorConfig:
+    """Sirius handler execution configurations."""
+
+    max_workers: int = attr.ib(
+        default=40,
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Number of threads used to run synchronous route handlers.",
+            )
+        },
+    )
+
+
+@attr.s(auto_attribs=True, slots=True)
+class RequestConfig:
+    """Sirius request body configurations."""
+
+    max_body_size: int = attr.ib(
+        default=0,
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Maximum request body size in bytes, 0 disables the limit.",
+            )
+        },
+    )
+    spool_threshold: int = attr.ib(
+        default=1024 * 1024,
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Request bodies larger than this many bytes are spooled to a temporary file.",
+            )
+        },
+    )
+
+
+@attr.s(auto_attribs=True, slots=True)
+class JSONConfig:
+    """Sirius JSON serialization configurations."""
+
+    encoder: str = attr.ib(
+        default="json",
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="JSON encoder for dict/list returns: json, orjson or a module:callable path.",
+            )
+        },
+    )
+
+
+@attr.s(auto_attribs=True, slots=True)
+class ETagConfig:
+    """Sirius conditional request configurations."""
+
+    enabled: bool = attr.ib(
+        default=True,
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Tag GET responses with an ETag and answer matching If-None-Match with 304.",
+            )
+        },
+    )
+
+
+@attr.s(auto_attribs=True, slots=True)
+class CompressionConfig:
+    """Sirius response compression configurations."""
+
+    enabled: bool = attr.ib(
+        default=True,
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Compress responses with gzip or deflate when the client accepts it.",
+            )
+        },
+    )
+    level: int = attr.ib(
+        default=6,
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Compression level, from 1 (fastest) to 9 (smallest).",
+            )
+        },
+    )
+    min_size: int = attr.ib(
+        default=1024,
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Minimum body size in bytes for a response to be compressed.",
+            )
+        },
+    )
+    content_types: t.List[str] = attr.ib(
+        factory=lambda: list(DEFAULT_CONTENT_TYPES),
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Content type prefixes of the responses to compress.",
+            )
+        },
+    )
+
+
+@attr.s(auto_attribs=True, slots=True)
+class MetricsConfig:
+    """Sirius request metrics configurations."""
+
+    enabled: bool = attr.ib(
+        default=True,
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Record per-route request counts and stage latencies.",
+            )
+        },
+    )
+    path: str = attr.ib(
+        default="",
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Path serving the metrics in the Prometheus text format, empty to not serve them.",
+            )
+        },
+    )
+
+
+@attr.s(auto_attribs=True, slots=True)
+class ProfilingConfig:
+    """Sirius request profiling configurations."""
+
+    sample_rate: float = attr.ib(
+        default=0.0,
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Fraction of requests to profile with cProfile, 0 disables sampling.",
+            )
+        },
+    )
+    header: str = attr.ib(
+        default="",
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Requests carrying this header are profiled, empty to disable the trigger.",
+            )
+        },
+    )
+    directory: str = attr.ib(
+        default="profiles",
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Folder the profiles are written to, one pstats file per request.",
+            )
+        },
+    )
+
+
+@attr.s(auto_attribs=True, slots=True)
+class LimitsConfig:
+    """Sirius concurrency limit configurations."""
+
+    max_concurrency: int = attr.ib(
+        default=0,
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Maximum number of requests handled at once, 0 disables the limit.",
+            )
+        },
+    )
+    max_queue: int = attr.ib(
+        default=100,
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Maximum number of requests waiting for a slot, others get a 503.",
+            )
+        },
+    )
+    queue_timeout: float = attr.ib(
+        default=5.0,
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Seconds a request waits for a slot before getting a 503.",
+            )
+        },
+    )
+    retry_after: int = attr.ib(
+        default=1,
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Seconds clients are asked to wait before retrying a shed request.",
+            )
+        },
+    )
+    routes: t.Dict[str, int] = attr.ib(
+        factory=dict,
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Maximum number of requests handled at once per route pattern.",
+            )
+        },
+    )
+
+
+@attr.s(auto_attribs=True, slots=True)
+class BackgroundConfig:
+    """Sirius background task configurations."""
+
+    max_workers: int = attr.ib(
+        default=4,
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Number of threads used to run synchronous background tasks.",
+            )
+        },
+    )
+    max_tasks: int = attr.ib(
+        default=100,
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Maximum number of requests whose background tasks run at once.",
+            )
+        },
+    )
+    drain_timeout: float = attr.ib(
+        default=10.0,
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Seconds to wait for background tasks on shutdown before cancelling them.",
+            )
+        },
+    )
+
+
+@attr.s(auto_attribs=True, slots=True)
+class StaticConfig:
+    """Sirius static file configurations."""
+
+    path: str = attr.ib(
+        default="src/static",
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Folder of static files, relative to the working directory. Only served when it exists.",
+            )
+        },
+    )
+    prefix: str = attr.ib(
+        default="/static",
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Path the static files are served under.",
+            )
+        },
+    )
+    stat_ttl: float = attr.ib(
+        default=1.0,
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Seconds file lookups are cached for.",
+            )
+        },
+    )
+    max_entries: int = attr.ib(
+        default=1024,
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Maximum number of cached file lookups, the least recently used are dropped first.",
+            )
+        },
+    )
+
+
+@attr.s(auto_attribs=True, slots=True)
+class BatchConfig:
+    """Sirius batch endpoint configurations."""
+
+    path: str = attr.ib(
+        default="",
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Path of the endpoint answering a JSON list of requests at once, empty to disable it.",
+            )
+        },
+    )
+    max_concurrency: int = attr.ib(
+        default=10,
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Maximum number of requests of a batch handled at once.",
+            )
+        },
+    )
+    max_items: int = attr.ib(
+        default=100,
+        metadata={
+            METADATA_TABLE: ConfigMetadata(
+                description="Maximum number of requests in a batch.",
+            )
+        },
+    )
+
+
 @attr.s(auto_attribs=True, slots=True)
 class Cfg:
     """Base configuration attrs class."""
 
     dev: DeveloperConfig = DeveloperConfig()
+    server: ServerConfig = ServerConfig()
+    routing: RoutingConfig = RoutingConfig()
+    executor: ExecutorConfig = ExecutorConfig()
+    request: RequestConfig = RequestConfig()
+    json: JSONConfig = JSONConfig()
+    etag: ETagConfig = ETagConfig()
+    compression: CompressionConfig = CompressionConfig()
+    metrics: MetricsConfig = MetricsConfig()
+    profiling: ProfilingConfig = ProfilingConfig()
+    limits: LimitsConfig = LimitsConfig()
+    background: BackgroundConfig = BackgroundConfig()
+    static: StaticConfig = StaticConfig()
+    batch: BatchConfig = BatchConfig()
 
 
 # build configuration
@@ -101,6 +505,9 @@ def _remove_extra_values(klass: type, dit: DictT) -> DictT:
         elif isinstance(cleared_dict[k], dict):
             if attr.has((new_klass := fields.get(k, None)).type):
                 cleared_dict[k] = _remove_extra_values(new_klass.type, cleared_dict[k])
+            elif t.get_origin(new_klass.type) is dict:
+                # a mapping field, its keys are values rather than config names
+                continue
             else:
                 # delete this dict
                 del cleared_dict[k]
@@ -138,3 +545,17 @@ def update_config(file: t.Optional[Path] = DEFAULT_CONFIG_FILE_PATH) -> None:
 
 def get_config() -> Config:
     return _CACHED_CONFIG
+
+
+def get_user_config() -> Cfg:
+    """
+    Return the user configuration for the running application.
+
+    If no configuration has been loaded yet (for example inside a server worker process), the default
+    configuration file in the working directory is loaded when present.
+    """
+    if _CACHED_CONFIG is None:
+        if not DEFAULT_CONFIG_FILE_PATH.is_file():
+            return _DEFAULT_CACHED_CONFIG
+        update_config(DEFAULT_CONFIG_FILE_PATH)
+    return _CACHED_CONFIG.user
@@ -43,7 +43,7 @@ def flatten(dictionary: dict, parent_key: str = "", sep: str = ".") -> dict:
 
     for k, v in dictionary.items():
         new_key = parent_key + sep + k if parent_key else k
-        if isinstance(v, dict):
+        if isinstance(v, dict) and v:
             items.extend(flatten(v, new_key, sep=sep).items())
         else:
             items.append((new_key, v))
@@ -85,7 +85,8 @@ def merge_copy(metadata, dump) -> OrderedDict:
     ret = OrderedDict()
 
     for key, value in dump.items():
-        if isinstance(value, dict):
+        # Dicts are sections, unless the field itself is a mapping
+        if isinstance(value, dict) and key in metadata:
             ret[key] = merge_copy(metadata[key], dump[key])
         else:
             ret[f"comment_{key}"] = metadata[f"comment_{key}"]
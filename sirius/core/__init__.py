@@ -1,4 +1,5 @@
+from sirius.core.background import BackgroundTasks
 from sirius.core.request import Request
 from sirius.core.response import Response
 
-__all__ = ("Request", "Response")
+__all__ = ("BackgroundTasks", "Request", "Response")
@@ -0,0 +1,83 @@
+import asyncio
+import inspect
+import logging
+from concurrent.futures import Executor
+from functools import partial
+from typing import Any, Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+Task = tuple[Callable[..., Any], tuple[Any, ...], dict[str, Any]]
+
+
+class BackgroundTasks:
+    """
+    Work to do once the response has been sent, such as sending an email or updating statistics.
+
+    Handlers get one by annotating a param with `BackgroundTasks`, and `add` the callables to run
+    with their arguments. The callables can be synchronous or coroutine functions, and are run one
+    after the other.
+    """
+
+    __slots__ = ("tasks",)
+
+    def __init__(self) -> None:
+        self.tasks: list[Task] = []
+
+    def add(self, function: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        self.tasks.append((function, args, kwargs))
+
+    def __iter__(self) -> Iterator[Task]:
+        return iter(self.tasks)
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+
+class TaskRunner:
+    """
+    Runs the background tasks of requests, off the request path.
+
+    At most `max_tasks` sets of tasks run at once, the others wait their turn. Synchronous tasks run
+    on `executor`, apart from the handlers' threads. Failures are logged and don't affect other
+    tasks. `drain()` waits for everything scheduled so far, for a graceful shutdown.
+    """
+
+    def __init__(self, executor: Executor, max_tasks: int = 100) -> None:
+        self.executor = executor
+        self.max_tasks = max_tasks
+        self.pending: set[asyncio.Task] = set()
+        self._semaphore: asyncio.Semaphore | None = None
+
+    def submit(self, tasks: BackgroundTasks) -> asyncio.Task:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_tasks)
+        task = asyncio.create_task(self.run(tasks))
+        # The loop only keeps weak references to tasks
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+        return task
+
+    async def run(self, tasks: BackgroundTasks) -> None:
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            for function, args, kwargs in tasks:
+                try:
+                    if inspect.iscoroutinefunction(function):
+                        await function(*args, **kwargs)
+                    else:
+                        await loop.run_in_executor(
+                            self.executor, partial(function, *args, **kwargs)
+                        )
+                except Exception:
+                    logger.exception("Background task %r failed", function)
+
+    async def drain(self, timeout: float | None = None) -> None:
+        """Wait for the scheduled tasks to finish, cancelling those still running after `timeout`."""
+        if not self.pending:
+            return
+        _, running = await asyncio.wait(set(self.pending), timeout=timeout)
+        for task in running:
+            task.cancel()
+        if running:
+            logger.warning("Cancelled %d background tasks on shutdown", len(running))
@@ -0,0 +1,158 @@
+import zlib
+from typing import Iterable
+from weakref import WeakKeyDictionary
+
+from sirius.core.response import (
+    Response,
+    ResponseBody,
+    ResponseStart,
+    StaticResponse,
+    StreamingResponse,
+    get_header,
+)
+
+# wbits selecting the container zlib writes for each content coding
+WBITS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+
+# Added to every response that would be compressed for a client accepting it
+VARY = ((b"Vary", b"Accept-Encoding"),)
+
+DEFAULT_CONTENT_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+def negotiate(accept_encoding: bytes | None) -> str | None:
+    """Pick the content coding to use from an `Accept-Encoding` header, preferring gzip."""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for item in accept_encoding.decode("latin-1").lower().split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip()] = quality
+
+    best = None
+    for coding in WBITS:
+        quality = accepted.get(coding, accepted.get("*", 0.0))
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (coding, quality)
+    return best[0] if best else None
+
+
+class Compressor:
+    """
+    Compresses responses with gzip or deflate, as negotiated through `Accept-Encoding`.
+
+    Complete responses are compressed when they are at least `min_size` bytes long and their
+    content type starts with one of `content_types`. Streamed responses are compressed chunk by
+    chunk, flushing after each chunk so clients can decode them as they arrive. Compressed variants
+    of shared responses (cache hits) are kept, so they are only compressed once. Every response
+    that would be compressed carries `Vary: Accept-Encoding`, whether or not the client accepts a
+    coding.
+    """
+
+    def __init__(
+        self,
+        level: int = 6,
+        min_size: int = 1024,
+        content_types: Iterable[str] = DEFAULT_CONTENT_TYPES,
+    ) -> None:
+        self.level = level
+        self.min_size = min_size
+        self.content_types = tuple(content_types)
+        self.variants: WeakKeyDictionary[StaticResponse, dict[str, StaticResponse]] = (
+            WeakKeyDictionary()
+        )
+
+    def compressible(self, response: Response) -> bool:
+        headers = response.start.headers
+        if get_header(headers, b"Content-Encoding") is not None:
+            return False
+        content_type = get_header(headers, b"Content-Type")
+        if content_type is None:
+            return False
+        content_type = content_type.decode("latin-1").partition(";")[0].strip()
+        return content_type.startswith(self.content_types)
+
+    def compressobj(self, coding: str) -> "zlib._Compress":
+        return zlib.compressobj(self.level, zlib.DEFLATED, WBITS[coding])
+
+    def __call__(self, accept_encoding: bytes | None, response: Response) -> Response:
+        if response.start.status < 200 or response.start.status in (204, 304):
+            return response
+        if isinstance(response, StreamingResponse):
+            if self.compressible(response):
+                coding = negotiate(accept_encoding)
+                if coding is None:
+                    response.start.headers += VARY
+                else:
+                    response.start.headers = self.encoded_headers(
+                        response.start.headers, coding
+                    )
+                    response.compressor = self.compressobj(coding)
+            return response
+
+        if len(response.body.body) < self.min_size or not self.compressible(response):
+            return response
+        # Caches must tell the clients accepting a coding apart even when this one doesn't
+        coding = negotiate(accept_encoding) or "identity"
+
+        if isinstance(response, StaticResponse):
+            variants = self.variants.setdefault(response, {})
+            variant = variants.get(coding)
+            if variant is None:
+                variant = variants[coding] = self.compress(
+                    response, coding, StaticResponse
+                )
+            return variant
+        return self.compress(response, coding, Response)
+
+    def compress(
+        self, response: Response, coding: str, cls: type[Response]
+    ) -> Response:
+        if coding == "identity":
+            return cls(
+                start=ResponseStart(
+                    status=response.start.status,
+                    headers=response.start.headers + VARY,
+                ),
+                body=response.body,
+            )
+        compressor = self.compressobj(coding)
+        body = compressor.compress(response.body.body) + compressor.flush()
+        headers = [
+            (key, value)
+            for key, value in response.start.headers
+            if key.lower() != b"content-length"
+        ]
+        return cls(
+            start=ResponseStart(
+                status=response.start.status,
+                headers=self.encoded_headers(headers, coding),
+            ),
+            body=ResponseBody(body=body),
+        )
+
+    @staticmethod
+    def encoded_headers(
+        headers: Iterable[tuple[bytes, bytes]], coding: str
+    ) -> tuple[tuple[bytes, bytes], ...]:
+        encoded = []
+        for key, value in headers:
+            # The compressed bytes differ from the ones the strong ETag was computed from
+            if key.lower() == b"etag" and not value.startswith(b"W/"):
+                value = b"W/" + value
+            encoded.append((key, value))
+        encoded.append((b"Content-Encoding", coding.encode("latin-1")))
+        return tuple(encoded) + VARY
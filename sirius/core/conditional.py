@@ -0,0 +1,68 @@
+import hashlib
+
+from sirius.core.response import (
+    Response,
+    ResponseStart,
+    StaticResponse,
+    StreamingResponse,
+    get_header,
+)
+
+
+def make_etag(body: bytes) -> bytes:
+    """A strong ETag derived from the encoded body."""
+    return b'"' + hashlib.blake2b(body, digest_size=16).hexdigest().encode() + b'"'
+
+
+def format_etag(version: str | bytes) -> bytes:
+    """Quote a handler provided version as a strong ETag."""
+    if isinstance(version, str):
+        version = version.encode("latin-1")
+    if version.startswith(b'"') or version.startswith(b"W/"):
+        return version
+    return b'"' + version + b'"'
+
+
+def etag_matches(if_none_match: bytes, etag: bytes) -> bool:
+    """Weak comparison of `etag` against an `If-None-Match` header value, as RFC 9110 requires."""
+    if if_none_match.strip() == b"*":
+        return True
+    etag = etag.removeprefix(b"W/")
+    return any(
+        candidate.strip().removeprefix(b"W/") == etag
+        for candidate in if_none_match.split(b",")
+    )
+
+
+def is_taggable(response: Response) -> bool:
+    return response.start.status == 200 and not isinstance(response, StreamingResponse)
+
+
+def with_etag(response: Response, etag: bytes | None = None) -> Response:
+    """
+    Make sure `response` carries an `ETag` header, hashing its body when no `etag` is given.
+
+    Shared responses are left untouched, they are tagged before being frozen.
+    """
+    if (
+        not is_taggable(response)
+        or isinstance(response, StaticResponse)
+        or get_header(response.start.headers, b"ETag") is not None
+    ):
+        return response
+    response.start.headers += ((b"ETag", etag or make_etag(response.body.body)),)
+    return response
+
+
+def not_modified(etag: bytes) -> Response:
+    return Response(start=ResponseStart(status=304, headers=[(b"ETag", etag)]))
+
+
+def evaluate(if_none_match: bytes | None, response: Response) -> Response:
+    """Replace `response` by a bodiless 304 if the client already has its current version."""
+    if if_none_match is None or not is_taggable(response):
+        return response
+    etag = get_header(response.start.headers, b"ETag")
+    if etag is not None and etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    return response
@@ -0,0 +1,271 @@
+import mimetypes
+import os
+import stat
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor
+from email.utils import formatdate, parsedate_to_datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator
+
+from sirius.core.conditional import etag_matches
+from sirius.core.request import Request
+from sirius.core.response import (
+    NOT_FOUND,
+    Response,
+    ResponseBody,
+    ResponseStart,
+    StreamingResponse,
+)
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# ASGI extension letting the server send a file by itself, typically with sendfile
+PATHSEND = "http.response.pathsend"
+
+
+@lru_cache(maxsize=256)
+def content_type_for(name: str) -> bytes:
+    """The `Content-Type` of a file, guessed from its name."""
+    content_type, _ = mimetypes.guess_type(name)
+    if content_type is None:
+        return b"application/octet-stream"
+    if content_type.startswith("text/"):
+        content_type += "; charset=utf-8"
+    return content_type.encode("latin-1")
+
+
+def read_file(path: str, offset: int, length: int, chunk_size: int) -> Iterator[bytes]:
+    with open(path, "rb") as file:
+        file.seek(offset)
+        while length > 0:
+            chunk = file.read(min(chunk_size, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+def parse_range(value: bytes, size: int) -> tuple[int, int] | None:
+    """
+    Parse a single `bytes=start-end` range into an `(offset, length)` pair.
+
+    Raises `ValueError` for unsatisfiable ranges and returns `None` for ranges that are ignored,
+    such as malformed ones or several ranges at once, which get the whole file.
+    """
+    unit, _, ranges = value.decode("latin-1").partition("=")
+    if unit.strip() != "bytes" or "," in ranges:
+        return None
+    start, _, end = ranges.strip().partition("-")
+    try:
+        first = int(start) if start.strip() else None
+        last = int(end) if end.strip() else None
+    except ValueError:
+        return None
+    if first is None:
+        if last is None:
+            return None
+        # A suffix range, the last `last` bytes
+        first, last = max(size - last, 0), size - 1
+    elif last is None or last >= size:
+        last = size - 1
+    elif last < first:
+        return None
+    if first >= size or last < first:
+        raise ValueError(value)
+    return first, last - first + 1
+
+
+class FileResponse(StreamingResponse):
+    """
+    A response sending a file from disk.
+
+    The file is read in chunks on `executor`, or sent by the server itself when it supports the
+    `http.response.pathsend` extension. It carries `Last-Modified` and an `ETag` derived from its
+    modification time and size, so conditional requests get a 304, and single byte `Range`
+    requests get a 206 with only that part of the file. Files are never compressed.
+
+    :param stat: An already known `os.stat` result of the file, to save the system call.
+    """
+
+    __slots__ = ("path", "size", "mtime", "etag", "chunk_size", "pathsend")
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        content_type: bytes | str | None = None,
+        headers: tuple[tuple[bytes, bytes], ...] = (),
+        stat: os.stat_result | None = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        executor: Executor | None = None,
+    ) -> None:
+        self.path = os.fspath(path)
+        stat = stat or os.stat(self.path)
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime
+        self.etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'.encode("latin-1")
+        self.chunk_size = chunk_size
+        self.pathsend = False
+        if isinstance(content_type, str):
+            content_type = content_type.encode("latin-1")
+        super().__init__(
+            ResponseStart(
+                status=200,
+                headers=(
+                    (b"Content-Type", content_type or content_type_for(self.path)),
+                    (b"Content-Length", str(self.size).encode("latin-1")),
+                    (b"Last-Modified", self.last_modified),
+                    (b"ETag", self.etag),
+                    (b"Accept-Ranges", b"bytes"),
+                    *headers,
+                ),
+            ),
+            read_file(self.path, 0, self.size, chunk_size),
+            executor,
+        )
+
+    @property
+    def last_modified(self) -> bytes:
+        return formatdate(self.mtime, usegmt=True).encode("latin-1")
+
+    def not_modified(self, request: Request) -> bool:
+        if_none_match = request.header(b"if-none-match")
+        if if_none_match is not None:
+            return etag_matches(if_none_match, self.etag)
+        if_modified_since = request.header(b"if-modified-since")
+        if if_modified_since is None:
+            return False
+        try:
+            since = parsedate_to_datetime(if_modified_since.decode("latin-1"))
+        except (TypeError, ValueError):
+            return False
+        return int(self.mtime) <= since.timestamp()
+
+    def evaluate(self, request: Request, executor: Executor | None = None) -> Response:
+        """Turn the response into the one to send for `request`, honoring its conditional headers."""
+        if self.executor is None:
+            self.executor = executor
+        if request.method not in ("GET", "HEAD"):
+            return self
+        if self.not_modified(request):
+            return Response(
+                start=ResponseStart(
+                    status=304,
+                    headers=[
+                        (b"ETag", self.etag),
+                        (b"Last-Modified", self.last_modified),
+                    ],
+                )
+            )
+        if request.method == "HEAD":
+            return Response(start=self.start, body=ResponseBody())
+
+        requested = request.header(b"range")
+        if_range = request.header(b"if-range")
+        if requested is not None and (
+            if_range is None or if_range in (self.etag, self.last_modified)
+        ):
+            try:
+                part = parse_range(requested, self.size)
+            except ValueError:
+                return Response(
+                    start=ResponseStart(
+                        status=416,
+                        headers=[
+                            (b"Content-Type", b"text/plain"),
+                            (
+                                b"Content-Range",
+                                f"bytes */{self.size}".encode("latin-1"),
+                            ),
+                        ],
+                    )
+                )
+            if part is not None:
+                offset, length = part
+                self.start.status = 206
+                self.start.headers = tuple(
+                    (key, value)
+                    for key, value in self.start.headers
+                    if key.lower() != b"content-length"
+                ) + (
+                    (b"Content-Length", str(length).encode("latin-1")),
+                    (
+                        b"Content-Range",
+                        f"bytes {offset}-{offset + length - 1}/{self.size}".encode(
+                            "latin-1"
+                        ),
+                    ),
+                )
+                self.stream = read_file(self.path, offset, length, self.chunk_size)
+                return self
+
+        self.pathsend = PATHSEND in request.asgi_scope.get("extensions", {})
+        return self
+
+
+class StaticFiles:
+    """
+    Serves the files of `directory` under the `prefix` path, for GET and HEAD requests.
+
+    Lookups are cached for `stat_ttl` seconds, missing files included, so frequently requested
+    files don't cost a `stat` each time. At most `max_entries` lookups are kept, evicting the least
+    recently used, so requests for random paths can't grow the cache. Paths escaping `directory`
+    are answered with a 404.
+    """
+
+    def __init__(
+        self,
+        directory: str | os.PathLike,
+        prefix: str = "/static",
+        stat_ttl: float = 1.0,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        max_entries: int = 1024,
+    ) -> None:
+        self.directory = os.path.realpath(directory)
+        self.prefix = prefix.rstrip("/")
+        self.stat_ttl = stat_ttl
+        self.chunk_size = chunk_size
+        self.max_entries = max_entries
+        self.entries: OrderedDict[str, tuple[float, os.stat_result | None]] = (
+            OrderedDict()
+        )
+
+    def stat(self, relative: str) -> os.stat_result | None:
+        entry = self.entries.get(relative)
+        now = time.monotonic()
+        if entry is not None and entry[0] > now:
+            self.entries.move_to_end(relative)
+            return entry[1]
+
+        result = None
+        path = os.path.realpath(os.path.join(self.directory, relative))
+        if path.startswith(self.directory + os.sep):
+            try:
+                result = os.stat(path)
+            except OSError:
+                pass
+            if result is not None and not stat.S_ISREG(result.st_mode):
+                result = None
+        self.entries[relative] = (now + self.stat_ttl, result)
+        self.entries.move_to_end(relative)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return result
+
+    def lookup(self, path: str) -> Response | None:
+        """The response for `path`, or `None` when it isn't under the mount."""
+        if not path.startswith(self.prefix + "/"):
+            return None
+        relative = path[len(self.prefix) + 1 :]
+        if not relative or relative.startswith("/") or "\0" in relative:
+            return NOT_FOUND
+        result = self.stat(relative)
+        if result is None:
+            return NOT_FOUND
+        return FileResponse(
+            Path(self.directory, relative),
+            content_type=content_type_for(relative),
+            stat=result,
+            chunk_size=self.chunk_size,
+        )
@@ -1,11 +1,17 @@
+import asyncio
 from dataclasses import dataclass
-from typing import Iterable, Literal, TypeVar
+from tempfile import SpooledTemporaryFile
+from typing import AsyncIterator, Callable, Iterable, Literal, TypeVar
 
+from sirius.core.background import BackgroundTasks
+from sirius.errors import ClientDisconnect, PayloadTooLargeError
 from sirius.types import Message, Scope, Receive
 
-
 Self = TypeVar("Self", bound="Request")
 
+# Bodies larger than this are moved from memory to a temporary file by `Request.load`
+DEFAULT_SPOOL_THRESHOLD = 1024 * 1024
+
 
 @dataclass
 class ConnectionScope:
@@ -13,6 +19,7 @@ class ConnectionScope:
 
     :param scope: The scope of the connection request.
     """
+
     type: Literal["http"]
     asgi_version: Literal["2.0", "2.1", "2.2", "2.3"]
     http_version: Literal["1.0", "1.1", "2.0"]
@@ -35,33 +42,234 @@ class RequestReceive:
 
 
 class Request:
-    def __init__(self, scope: Scope, receive: Message) -> None:
-        self.scope = ConnectionScope(
-            type=scope.pop("type", "http"),
-            asgi_version=scope.pop("asgi.version", "2.0"),
-            http_version=scope.pop("http.version"),
-            method=scope.pop("method"),
-            scheme=scope.pop("scheme", "http"),
-            **scope,
-        )
-        self.receive = RequestReceive(
-            **receive,
-        )
+    """
+    An incoming HTTP request.
 
-    @classmethod
-    async def from_request(cls: type[Self], scope: Scope, receive: Receive) -> Self:
-        receive_body = b""
-        more_body = True
+    The request is a view over the ASGI scope, which is neither copied nor modified. `method`,
+    `path` and `query_string` are read from it once, headers are indexed on the first `header()`
+    lookup, and the `ConnectionScope` dataclass is only built when `scope` is accessed.
+
+    The body is not read up front. Handlers that take a `Request` parameter can either iterate
+    over it with `stream()`, collect it with `body()`, or spool it with `load()`, which keeps small
+    bodies in memory and moves large ones to a temporary file. All three raise `ClientDisconnect`
+    when the client goes away before the body is complete, rather than returning part of it.
+
+    `route` is the pattern of the route the request matched, once it has been routed, and
+    `background` the tasks its handler scheduled to run after the response, if any.
+
+    :param max_body_size: Reject bodies larger than this many bytes, `0` disables the limit.
+    :param spool_threshold: Size above which `load()` moves the body to a temporary file.
+    """
+
+    __slots__ = (
+        "asgi_scope",
+        "method",
+        "path",
+        "query_string",
+        "max_body_size",
+        "spool_threshold",
+        "route",
+        "background",
+        "file",
+        "receive",
+        "_connection",
+        "_headers",
+        "_body",
+        "_consumed",
+        "_received",
+        "_receive",
+        "_pending",
+        "_after_response",
+    )
+
+    def __init__(
+        self,
+        scope: Scope,
+        receive: Message | Receive,
+        max_body_size: int = 0,
+        spool_threshold: int = DEFAULT_SPOOL_THRESHOLD,
+    ) -> None:
+        self.asgi_scope = scope
+        self.method: str = scope["method"]
+        self.path: str = scope["path"]
+        self.query_string: bytes = scope.get("query_string", b"")
+        self.max_body_size = max_body_size
+        self.spool_threshold = spool_threshold
+        self.route: str | None = None
+        self.background: BackgroundTasks | None = None
+        self.file: SpooledTemporaryFile | None = None
+        self._connection: ConnectionScope | None = None
+        self._headers: dict[bytes, bytes] | None = None
+        self._body: bytes | None = None
+        self._consumed = False
+        # Whether the last body message arrived, and the body messages handed over by `disconnected`
+        self._received = False
+        self._pending: asyncio.Queue | None = None
+        self._after_response: list[Callable[[], None]] = []
+
+        # Already received messages are kept for backwards compatibility
+        if callable(receive):
+            self._receive: Receive | None = receive
+            self.receive: RequestReceive | None = None
+        else:
+            self._receive = None
+            self.receive = RequestReceive(**receive)
+            self._body = self.receive.body
+            self._consumed = True
+            self._received = True
 
+    @property
+    def scope(self) -> ConnectionScope:
+        if self._connection is None:
+            scope = self.asgi_scope
+            self._connection = ConnectionScope(
+                type=scope.get("type", "http"),
+                asgi_version=scope.get("asgi", {}).get("spec_version", "2.0"),
+                http_version=scope.get("http_version", "1.1"),
+                method=self.method,
+                scheme=scope.get("scheme", "http"),
+                path=self.path,
+                raw_path=scope.get("raw_path", b""),
+                query_string=self.query_string,
+                root_path=scope.get("root_path", ""),
+                headers=scope.get("headers", []),
+                client=scope.get("client"),
+                server=scope.get("server"),
+            )
+        return self._connection
+
+    def header(self, name: bytes) -> bytes | None:
+        """The value of the first header called `name`, compared case-insensitively."""
+        headers = self._headers
+        if headers is None:
+            headers = self._headers = {}
+            for key, value in self.asgi_scope.get("headers", ()):
+                headers.setdefault(key.lower(), value)
+        return headers.get(name.lower())
+
+    def call_after_response(self, callback: Callable[[], None]) -> None:
+        """Have `callback` called by `finish()`, once the response is over, sent or not."""
+        self._after_response.append(callback)
+
+    def finish(self) -> None:
+        callbacks, self._after_response = self._after_response, []
+        for callback in callbacks:
+            callback()
+
+    @property
+    def content_length(self) -> int | None:
+        length = self.header(b"content-length")
+        if length is None:
+            return None
+        try:
+            return int(length)
+        except ValueError:
+            return None
+
+    def check_content_length(self) -> None:
+        """Reject the request from its `Content-Length` header, before any of the body is read."""
+        length = self.content_length
+        if self.max_body_size and length is not None and length > self.max_body_size:
+            raise PayloadTooLargeError(
+                f"Request body of {length} bytes exceeds {self.max_body_size} bytes"
+            )
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        """Iterate over the body chunks as they arrive, without buffering them."""
+        if self._body is not None:
+            yield self._body
+            return
+        if self.file is not None:
+            self.file.seek(0)
+            while chunk := self.file.read(64 * 1024):
+                yield chunk
+            self.file.seek(0)
+            return
+        if self._consumed:
+            raise RuntimeError("The request body has already been streamed")
+
+        self._consumed = True
+        self.check_content_length()
+        received = 0
+        more_body = True
         while more_body:
-            message = await receive()
-            receive_body += message.get("body", b"")
+            message = await self._message()
+            if message["type"] == "http.disconnect":
+                raise ClientDisconnect(
+                    f"Client disconnected after {received} bytes of the body"
+                )
+            chunk = message.get("body", b"")
+            received += len(chunk)
+            if self.max_body_size and received > self.max_body_size:
+                raise PayloadTooLargeError(
+                    f"Request body exceeds {self.max_body_size} bytes"
+                )
             more_body = message.get("more_body", False)
+            if not more_body:
+                self._received = True
+            if chunk:
+                yield chunk
 
-        receive_req = {
-            "type": message.get("type"),
-            "body": receive_body,
-            "more_body": more_body,
-        }
+    async def _message(self) -> Message:
+        pending = self._pending
+        if pending is None:
+            return await self._receive()
+        message = await pending.get()
+        pending.task_done()
+        return message
 
-        return cls(scope, receive_req)
+    async def disconnected(self) -> None:
+        """
+        Return once the client has disconnected.
+
+        Waiting takes over receiving from the connection. Body messages still to come are handed
+        over to `stream()` one at a time, so the body can be read meanwhile, by a streamed response
+        for instance. Until the body is read, its next message holds the wait back.
+        """
+        if self._receive is None:
+            # Built from an already received message, there is no connection to watch
+            await asyncio.Future()
+        if not self._received:
+            pending = self._pending = asyncio.Queue()
+            while True:
+                message = await self._receive()
+                pending.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    return
+                if not message.get("more_body", False):
+                    break
+                await pending.join()
+        while (await self._receive())["type"] != "http.disconnect":
+            pass
+
+    async def body(self) -> bytes:
+        """Read the whole body into memory."""
+        if self._body is None:
+            if self.file is not None:
+                self.file.seek(0)
+                self._body = self.file.read()
+                self.file.seek(0)
+            else:
+                body = bytearray()
+                async for chunk in self.stream():
+                    body += chunk
+                self._body = bytes(body)
+        return self._body
+
+    async def load(self) -> SpooledTemporaryFile:
+        """Read the whole body into a file object, spilling to disk above `spool_threshold`."""
+        if self.file is None:
+            file = SpooledTemporaryFile(max_size=self.spool_threshold)
+            async for chunk in self.stream():
+                file.write(chunk)
+            file.seek(0)
+            self.file = file
+        return self.file
+
+    @classmethod
+    async def from_request(cls: type[Self], scope: Scope, receive: Receive) -> Self:
+        request = cls(scope, receive)
+        request.receive = RequestReceive(
+            type="http.request", body=await request.body(), more_body=False
+        )
+        return request
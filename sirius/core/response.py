@@ -1,22 +1,164 @@
-from dataclasses import dataclass, field
-from typing import Iterable
+from concurrent.futures import Executor
+from typing import AsyncIterable, Any, Iterable
+
+Headers = tuple[tuple[bytes, bytes], ...]
 
 
-@dataclass
 class ResponseStart:
-    type: bytes = "http.response.start"
-    status: int = 200
-    headers: Iterable[tuple[bytes, bytes]] = field(default_factory=list)
+    __slots__ = ("status", "headers")
+
+    type = "http.response.start"
+
+    def __init__(
+        self, status: int = 200, headers: Iterable[tuple[bytes, bytes]] = ()
+    ) -> None:
+        self.status = status
+        self.headers: Headers = tuple(headers)
+
+    def message(self) -> dict:
+        return {"type": self.type, "status": self.status, "headers": self.headers}
+
+    def __repr__(self) -> str:
+        return f"ResponseStart(status={self.status!r}, headers={self.headers!r})"
 
 
-@dataclass
 class ResponseBody:
-    type: bytes = "http.response.body"
-    body: bytes = b""
-    more_body: bool = False
+    __slots__ = ("body", "more_body")
+
+    type = "http.response.body"
+
+    def __init__(self, body: bytes = b"", more_body: bool = False) -> None:
+        self.body = body
+        self.more_body = more_body
+
+    def message(self) -> dict:
+        return {"type": self.type, "body": self.body, "more_body": self.more_body}
+
+    def __repr__(self) -> str:
+        return f"ResponseBody(body={self.body!r}, more_body={self.more_body!r})"
+
+
+# Statuses that never carry a body, and so no `Content-Length`
+NO_BODY_STATUSES = frozenset({204, 304})
+
+
+def get_header(headers: Headers, name: bytes) -> bytes | None:
+    name = name.lower()
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def has_header(headers: Headers, name: bytes) -> bool:
+    return get_header(headers, name) is not None
 
 
-@dataclass
 class Response:
-    start: ResponseStart = field(default_factory=ResponseStart)
-    body: ResponseBody = field(default_factory=ResponseBody)
+    """
+    A complete response, ready to be emitted as the two ASGI messages returned by `messages()`.
+
+    Headers are kept as a tuple of already encoded pairs and `Content-Length` is added on
+    construction when the caller didn't set one.
+    """
+
+    __slots__ = ("start", "body")
+
+    def __init__(
+        self, start: ResponseStart | None = None, body: ResponseBody | None = None
+    ) -> None:
+        self.start = start or ResponseStart()
+        self.body = body or ResponseBody()
+        if (
+            not self.body.more_body
+            and self.start.status not in NO_BODY_STATUSES
+            and not has_header(self.start.headers, b"Content-Length")
+        ):
+            self.start.headers += (
+                (b"Content-Length", str(len(self.body.body)).encode("latin-1")),
+            )
+
+    def messages(self) -> tuple[dict, dict]:
+        return self.start.message(), self.body.message()
+
+    def __repr__(self) -> str:
+        return f"Response(start={self.start!r}, body={self.body!r})"
+
+
+class StaticResponse(Response):
+    """
+    A response built once and shared between requests, such as the router's 404 and 405s.
+
+    Its messages are created up front and handed out as is, so emitting it allocates nothing.
+    Neither the response nor its messages may be mutated.
+    """
+
+    __slots__ = ("_messages", "__weakref__")
+
+    def __init__(
+        self, start: ResponseStart | None = None, body: ResponseBody | None = None
+    ) -> None:
+        super().__init__(start, body)
+        self._messages = super().messages()
+
+    def messages(self) -> tuple[dict, dict]:
+        return self._messages
+
+
+class StreamingResponse(Response):
+    """
+    A response whose body is produced chunk by chunk from an iterator or async iterator of
+    `bytes`/`str`. Synchronous iterators are advanced on `executor`, or inline when it is `None`.
+
+    `compressor` is a `zlib` compression object each chunk is passed through, when the response is
+    sent compressed.
+    """
+
+    __slots__ = ("stream", "executor", "compressor")
+
+    def __init__(
+        self,
+        start: ResponseStart | None = None,
+        stream: Iterable[bytes | str] | AsyncIterable[bytes | str] = (),
+        executor: Executor | None = None,
+    ) -> None:
+        super().__init__(start, ResponseBody(more_body=True))
+        self.stream = stream
+        self.executor = executor
+        self.compressor = None
+
+
+def is_stream(obj: Any) -> bool:
+    """Whether a handler return value should be sent as a streamed body."""
+    if isinstance(obj, (str, bytes, bytearray, memoryview, dict, list, tuple)):
+        return False
+    return hasattr(obj, "__aiter__") or hasattr(obj, "__next__")
+
+
+NOT_FOUND = StaticResponse(
+    start=ResponseStart(status=404, headers=[(b"Content-Type", b"text/plain")])
+)
+PAYLOAD_TOO_LARGE = StaticResponse(
+    start=ResponseStart(status=413, headers=[(b"Content-Type", b"text/plain")])
+)
+# Nginx's status for requests the client closed before they were answered, only recorded in the
+# metrics: the app never sends it
+CLIENT_CLOSED_REQUEST = StaticResponse(
+    start=ResponseStart(status=499, headers=[(b"Content-Type", b"text/plain")])
+)
+SERVICE_UNAVAILABLE = StaticResponse(
+    start=ResponseStart(status=503, headers=[(b"Content-Type", b"text/plain")])
+)
+
+
+def method_not_allowed(allowed: Iterable[str]) -> StaticResponse:
+    """Build the shared 405 response for a route supporting the `allowed` methods."""
+    return StaticResponse(
+        start=ResponseStart(
+            status=405,
+            headers=[
+                (b"Content-Type", b"text/plain"),
+                (b"Allow", ", ".join(allowed).upper().encode("latin-1")),
+            ],
+        )
+    )
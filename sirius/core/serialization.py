@@ -0,0 +1,111 @@
+import dataclasses
+import importlib
+import json
+from concurrent.futures import Executor
+from typing import Any, Callable
+
+from sirius.core.response import (
+    Response,
+    ResponseBody,
+    ResponseStart,
+    StreamingResponse,
+    is_stream,
+)
+
+Encoder = Callable[[Any], bytes | str]
+
+TEXT = b"text/plain"
+JSON = b"application/json"
+
+
+def _default(obj: Any) -> Any:
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+_json_encoder = json.JSONEncoder(
+    separators=(",", ":"), ensure_ascii=False, default=_default
+)
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode `obj` with the standard library encoder, without any insignificant whitespace."""
+    return _json_encoder.encode(obj).encode("utf-8")
+
+
+def load_encoder(name: str) -> Encoder:
+    """
+    Resolve the configured JSON encoder.
+
+    `json` is the compact standard library encoder and `orjson` is `orjson.dumps`. Anything else is
+    imported as a `module:attribute` path to a callable taking an object and returning `bytes`
+    (or `str`).
+    """
+    if name == "json":
+        return dumps
+    if name == "orjson":
+        name = "orjson:dumps"
+    module, _, attribute = name.partition(":")
+    if not attribute:
+        raise ValueError(f"JSON encoder {name!r} must be given as module:attribute")
+    return getattr(importlib.import_module(module), attribute)
+
+
+class Serializer:
+    """
+    Turns whatever a route handler returned into a `Response`.
+
+    Handlers may return a `Response`, `str`/`bytes`, a JSON value (`dict`, `list` or dataclass), an
+    iterator to stream, or an `int` status code, and any of these (apart from `int`) paired with a
+    status code as `(value, status)`.
+    """
+
+    def __init__(self, encoder: Encoder = dumps) -> None:
+        self.encoder = encoder
+
+    def encode_json(self, obj: Any) -> bytes:
+        encoded = self.encoder(obj)
+        if isinstance(encoded, str):
+            encoded = encoded.encode("utf-8")
+        return encoded
+
+    def __call__(self, result: Any, executor: Executor | None = None) -> Response:
+        status_code = 200
+        match result:
+            case Response():
+                return result
+            case int(code) if not isinstance(code, bool):
+                return self.response(b"", code, TEXT)
+            case tuple((value, int(code))):
+                result = value
+                status_code = code
+
+        match result:
+            case str(text):
+                return self.response(text.encode("utf-8"), status_code, TEXT)
+            case bytes():
+                return self.response(result, status_code, TEXT)
+            case bytearray() | memoryview():
+                return self.response(bytes(result), status_code, TEXT)
+            case None:
+                return self.response(b"", status_code, TEXT)
+            case stream if is_stream(stream):
+                return StreamingResponse(
+                    start=ResponseStart(
+                        status=status_code, headers=[(b"Content-Type", TEXT)]
+                    ),
+                    stream=stream,
+                    executor=executor,
+                )
+            case _:
+                return self.response(self.encode_json(result), status_code, JSON)
+
+    @staticmethod
+    def response(body: bytes, status_code: int, content_type: bytes) -> Response:
+        return Response(
+            start=ResponseStart(
+                status=status_code, headers=[(b"Content-Type", content_type)]
+            ),
+            body=ResponseBody(body=body),
+        )
@@ -2,3 +2,27 @@ class CfgLoadError(Exception):
     """Exception if the configuration failed to load from a local file."""
 
     ...
+
+
+class ParamError(Exception):
+    """Exception if the request params could not be bound to a route handler."""
+
+    ...
+
+
+class PayloadTooLargeError(Exception):
+    """Exception if a request body exceeds the configured maximum size."""
+
+    ...
+
+
+class ClientDisconnect(Exception):
+    """Exception if the client disconnected before the whole request body was received."""
+
+    ...
+
+
+class BatchError(Exception):
+    """Exception if the body of a batch request is not a valid list of sub-requests."""
+
+    ...
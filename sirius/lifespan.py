@@ -0,0 +1,51 @@
+import importlib
+from pathlib import Path
+from typing import Any, Callable
+
+from sirius.routing.plan import CallPlan
+
+# Module of the route folder holding the startup and shutdown hooks, it is not a route itself
+LIFESPAN_MODULE = "_lifespan"
+
+
+class Lifespan:
+    """
+    The startup and shutdown hooks of an application.
+
+    They are read from the `_lifespan.py` module of the route folder, which may define:
+
+    - `startup()`, returning a mapping of application resources (database pools, HTTP clients...)
+      that handlers receive through params of the same name.
+    - `shutdown()`, receiving the resources it names as params, to release them.
+
+    Both can be synchronous or coroutine functions.
+    """
+
+    def __init__(
+        self, startup: Callable | None = None, shutdown: Callable | None = None
+    ) -> None:
+        self.startup_plan = CallPlan.compile(startup) if startup is not None else None
+        self.shutdown_plan = (
+            CallPlan.compile(shutdown) if shutdown is not None else None
+        )
+
+    @classmethod
+    def discover(cls, routes_path: str) -> "Lifespan":
+        """Import the hooks from the lifespan module of `routes_path`, when there is one."""
+        if not (Path.cwd() / routes_path / f"{LIFESPAN_MODULE}.py").is_file():
+            return cls()
+        module_path = ".".join((*Path(routes_path).parts, LIFESPAN_MODULE))
+        module = importlib.import_module(module_path)
+        return cls(getattr(module, "startup", None), getattr(module, "shutdown", None))
+
+    async def startup(self) -> dict[str, Any]:
+        if self.startup_plan is None:
+            return {}
+        resources = await self.startup_plan.invoke(self.startup_plan.bind({}))
+        return dict(resources or {})
+
+    async def shutdown(self, resources: dict[str, Any]) -> None:
+        if self.shutdown_plan is None:
+            return
+        self.shutdown_plan.provide(resources)
+        await self.shutdown_plan.invoke(self.shutdown_plan.bind({}))
@@ -0,0 +1,162 @@
+from bisect import bisect_left
+from typing import Any, Iterable, Mapping
+
+from sirius.core.response import Response, ResponseBody, ResponseStart
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Stages of a request that are timed: matching and binding, waiting for a concurrency limiter
+# slot, the handler itself, turning its return value into a response, writing the response, and
+# the request as a whole
+STAGES = ("route", "queue", "handler", "serialize", "send", "total")
+
+# Requests that didn't match any route are accounted together, to keep the label set bounded
+UNMATCHED = "<unmatched>"
+
+# Metric, type, `Limiter` attribute and help of the reported concurrency limiter state
+LIMITER_METRICS = (
+    ("sirius_limit_active", "gauge", "active", "Requests holding a slot."),
+    ("sirius_limit_queue_depth", "gauge", "depth", "Requests waiting for a slot."),
+    ("sirius_limit_shed_total", "counter", "shed", "Requests rejected with a 503."),
+)
+
+CONTENT_TYPE = b"text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        # One count per bucket, plus the overflow past the last one
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+
+class RouteMetrics:
+    __slots__ = ("statuses", "stages")
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.statuses: dict[str, int] = {}
+        self.stages = {stage: Histogram(buckets) for stage in STAGES}
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    """
+    Per-route request counts, by status class, and latency histograms of each request stage.
+
+    Routes are keyed on their pattern rather than the requested path. Counters are plain integers
+    only ever updated from the event loop, so recording a request takes no lock. Every worker
+    process keeps its own metrics.
+
+    The state of concurrency limiters handed to `watch` is reported along with them.
+    """
+
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.routes: dict[str, RouteMetrics] = {}
+        self.limiters: list[Mapping[str, Any]] = []
+
+    def watch(self, limiters: Mapping[str, Any]) -> None:
+        """Report the limiters of `limiters`, keyed by name, including ones added later."""
+        self.limiters.append(limiters)
+
+    def route(self, pattern: str) -> RouteMetrics:
+        metrics = self.routes.get(pattern)
+        if metrics is None:
+            metrics = self.routes[pattern] = RouteMetrics(self.buckets)
+        return metrics
+
+    def observe(self, pattern: str, stage: str, seconds: float) -> None:
+        self.route(pattern).stages[stage].observe(seconds)
+
+    def record(self, pattern: str, status: int, seconds: float) -> None:
+        """Account for a finished request, which took `seconds` in total."""
+        metrics = self.route(pattern)
+        status_class = f"{status // 100}xx"
+        metrics.statuses[status_class] = metrics.statuses.get(status_class, 0) + 1
+        metrics.stages["total"].observe(seconds)
+
+    def render(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP sirius_requests_total Requests handled, by route and status class.",
+            "# TYPE sirius_requests_total counter",
+        ]
+        routes = sorted(self.routes.items())
+        for pattern, metrics in routes:
+            route = _label(pattern)
+            for status, count in sorted(metrics.statuses.items()):
+                lines.append(
+                    f'sirius_requests_total{{route="{route}",status="{status}"}} {count}'
+                )
+
+        lines += [
+            "# HELP sirius_request_duration_seconds Time spent in each stage of a request.",
+            "# TYPE sirius_request_duration_seconds histogram",
+        ]
+        for pattern, metrics in routes:
+            route = _label(pattern)
+            for stage, histogram in metrics.stages.items():
+                count = histogram.count
+                if not count:
+                    continue
+                labels = f'route="{route}",stage="{stage}"'
+                cumulative = 0
+                for bound, bucket in zip(self.buckets, histogram.counts):
+                    cumulative += bucket
+                    lines.append(
+                        f'sirius_request_duration_seconds_bucket{{{labels},le="{bound}"}} '
+                        f"{cumulative}"
+                    )
+                lines += [
+                    f'sirius_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}',
+                    f"sirius_request_duration_seconds_sum{{{labels}}} {histogram.sum}",
+                    f"sirius_request_duration_seconds_count{{{labels}}} {count}",
+                ]
+
+        limiters = sorted(
+            (item for watched in self.limiters for item in watched.items()),
+            key=lambda item: item[0],
+        )
+        if limiters:
+            for metric, kind, attribute, help in LIMITER_METRICS:
+                lines += [f"# HELP {metric} {help}", f"# TYPE {metric} {kind}"]
+                for name, limiter in limiters:
+                    value = getattr(limiter, attribute)
+                    lines.append(f'{metric}{{limit="{_label(name)}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def response(self) -> Response:
+        return Response(
+            start=ResponseStart(status=200, headers=[(b"Content-Type", CONTENT_TYPE)]),
+            body=ResponseBody(body=self.render().encode("utf-8")),
+        )
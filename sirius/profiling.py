@@ -0,0 +1,87 @@
+import cProfile
+import os
+import pstats
+import random
+import re
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from sirius.core.request import Request
+from sirius.core.response import Response
+from sirius.metrics import UNMATCHED
+
+# The profiles of the synchronous handler calls made on executor threads for the profiled request
+thread_profiles: ContextVar[list[cProfile.Profile] | None] = ContextVar(
+    "thread_profiles", default=None
+)
+
+
+def profiled_call(function: Callable[[], Any], profiles: list[cProfile.Profile]) -> Any:
+    """Call `function` under a profiler of its own, for calls running on another thread."""
+    profile = cProfile.Profile()
+    profiles.append(profile)
+    return profile.runcall(function)
+
+
+def profile_name(pattern: str) -> str:
+    """A file name friendly version of a route pattern, `/users/<id>` becomes `users_id`."""
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", pattern).strip("_") or "index"
+
+
+class Profiler:
+    """
+    Profiles a sample of requests with `cProfile`, writing one `pstats` file per request.
+
+    A request is profiled when it carries the `header` trigger header, or otherwise with a
+    probability of `sample_rate`. Files are named after the pattern of the route the request
+    matched, so they can be grouped per route with `pstats` or `snakeviz`.
+
+    Only one request is profiled at a time, as a single profiler can be active per thread; requests
+    arriving in the meantime are not profiled. Other requests served on the event loop while the
+    profiled one is awaiting show up in its profile. Synchronous handlers running on the executor
+    are profiled on their thread and merged into the same file.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        sample_rate: float = 0.0,
+        header: bytes | None = None,
+    ) -> None:
+        self.directory = Path(directory)
+        self.sample_rate = sample_rate
+        self.header = header.lower() if header else None
+        self.active = False
+
+    def wanted(self, request: Request) -> bool:
+        if self.active:
+            return False
+        if self.header is not None and request.header(self.header) is not None:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def profile(self, request: Request, routed: Awaitable[Response]) -> Response:
+        """Await `routed`, the routing of `request`, under the profiler."""
+        profile = cProfile.Profile()
+        profiles: list[cProfile.Profile] = []
+        token = thread_profiles.set(profiles)
+        self.active = True
+        profile.enable()
+        try:
+            return await routed
+        finally:
+            profile.disable()
+            thread_profiles.reset(token)
+            self.active = False
+            self.dump([profile, *profiles], request.route or UNMATCHED)
+
+    def dump(self, profiles: list[cProfile.Profile], pattern: str) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        file = (
+            self.directory
+            / f"{profile_name(pattern)}-{time.time_ns()}-{os.getpid()}.prof"
+        )
+        pstats.Stats(*profiles).dump_stats(file)
+        return file
@@ -0,0 +1,196 @@
+import asyncio
+import contextlib
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from pathlib import Path
+from typing import Iterator
+
+import uvicorn
+
+import sirius
+from sirius.config.config import DEFAULT_CONFIG_FILE_PATH
+from sirius.server import worker_process
+
+# Exit code of a development server asking to be started again
+RESTART_EXIT_CODE = 3
+
+Snapshot = dict[Path, int]
+
+# Folders of a project that never hold code it runs, besides hidden ones and virtualenvs
+IGNORED_FOLDERS = frozenset({"__pycache__", "node_modules", "site-packages"})
+
+
+def ignored(directory: str, name: str) -> bool:
+    return (
+        name in IGNORED_FOLDERS
+        or name.startswith(".")
+        or os.path.isfile(os.path.join(directory, name, "pyvenv.cfg"))
+    )
+
+
+def python_files(root: Path) -> Iterator[Path]:
+    for directory, folders, names in os.walk(root):
+        folders[:] = [name for name in folders if not ignored(directory, name)]
+        for name in names:
+            if name.endswith(".py"):
+                yield Path(directory, name)
+
+
+def snapshot(*roots: Path) -> Snapshot:
+    """The modification times of the Python files under `roots`."""
+    files = {}
+    for root in roots:
+        if root.is_file():
+            paths = [root]
+        elif root.is_dir():
+            paths = python_files(root)
+        else:
+            continue
+        for path in paths:
+            with contextlib.suppress(OSError):
+                files[path] = path.stat().st_mtime_ns
+    return files
+
+
+def watched_roots(config_file: Path | None = None) -> list[Path]:
+    """What a development server depends on: the project, Sirius and the configuration."""
+    return [
+        Path.cwd(),
+        Path(sirius.__file__).parent,
+        Path(config_file or DEFAULT_CONFIG_FILE_PATH),
+    ]
+
+
+def changes(before: Snapshot, after: Snapshot) -> set[Path]:
+    return {
+        path
+        for path in before.keys() | after.keys()
+        if before.get(path) != after.get(path)
+    }
+
+
+class HotReloader:
+    """
+    Keeps a development server in sync with the code it serves.
+
+    Changes to route modules are applied in place: only the changed modules are imported again,
+    added and removed route files are picked up, and every other route keeps its compiled handlers
+    and warm caches. Changes to any other Python file of the project (shared code, the
+    `_lifespan.py` hooks or other underscored modules of the route folder), to Sirius itself or to
+    the configuration file call for a full restart. Bytecode caches, hidden folders and virtualenvs
+    aren't watched.
+    """
+
+    def __init__(
+        self, app, interval: float = 0.5, config_file: Path | None = None
+    ) -> None:
+        self.app = app
+        self.interval = interval
+        self.route_folder = Path.cwd() / app.config.routing.path
+        self.roots = watched_roots(config_file)
+        self.files = snapshot(*self.roots)
+        self.restart = False
+
+    def is_route(self, path: Path) -> bool:
+        try:
+            relative = path.relative_to(self.route_folder)
+        except ValueError:
+            return False
+        # Like route discovery, underscored modules aren't routes, package `__init__`s are
+        return path.suffix == ".py" and (
+            not relative.parts[0].startswith("_") or relative.name == "__init__.py"
+        )
+
+    def module_path(self, path: Path) -> str:
+        return ".".join(path.relative_to(Path.cwd()).with_suffix("").parts)
+
+    def check(self) -> bool:
+        """Apply the changes made since the last check. Returns whether a restart is needed."""
+        files = snapshot(*self.roots)
+        changed = changes(self.files, files)
+        self.files = files
+        if not changed:
+            return False
+        if not all(self.is_route(path) for path in changed):
+            return True
+
+        try:
+            routes = self.app.router.reload(self.module_path(path) for path in changed)
+        except Exception:
+            # Broken code is reported, the route stays unloaded until it is fixed
+            traceback.print_exc()
+            return False
+        print(f"Reloaded {', '.join(sorted(routes)) or 'nothing'}.", file=sys.stderr)
+        return False
+
+    async def watch(self, server: uvicorn.Server) -> None:
+        while not server.should_exit:
+            await asyncio.sleep(self.interval)
+            if self.check():
+                print("Restarting...", file=sys.stderr)
+                self.restart = True
+                server.should_exit = True
+
+
+def run_dev_worker(port: int, config_file: str | None, interval: float) -> None:
+    """Entry point of the development server process."""
+    restart = False
+    with worker_process(config_file):
+        from sirius.sirius import sirius as app
+
+        server = uvicorn.Server(uvicorn.Config(app, port=port))
+        reloader = HotReloader(app, interval, config_file and Path(config_file))
+
+        async def main() -> None:
+            watcher = asyncio.create_task(reloader.watch(server))
+            try:
+                await server.serve()
+            finally:
+                watcher.cancel()
+
+        asyncio.run(main())
+        restart = reloader.restart
+    if restart:
+        sys.exit(RESTART_EXIT_CODE)
+
+
+def run_dev(port: int, config_file: str | None = None, interval: float = 0.5) -> None:
+    """
+    Run the development server, starting it again whenever it asks for a full restart.
+
+    A server that crashes, on broken code for instance, is started again once files change.
+    """
+    context = multiprocessing.get_context("spawn")
+    roots = watched_roots(config_file and Path(config_file))
+    print(
+        f"Development server on http://127.0.0.1:{port} (pid {os.getpid()}).",
+        file=sys.stderr,
+    )
+    while True:
+        files = snapshot(*roots)
+        process = context.Process(
+            target=run_dev_worker, args=(port, config_file, interval)
+        )
+        process.start()
+        try:
+            process.join()
+        except KeyboardInterrupt:
+            process.join()
+            return
+        if process.exitcode == RESTART_EXIT_CODE:
+            continue
+        if process.exitcode == 0:
+            return
+
+        print(
+            f"Server exited with code {process.exitcode}, waiting for changes...",
+            file=sys.stderr,
+        )
+        try:
+            while not changes(files, snapshot(*roots)):
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            return
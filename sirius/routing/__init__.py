@@ -1,3 +1,13 @@
+from sirius.routing.cache import ResponseCache
+from sirius.routing.limits import Limiter
+from sirius.routing.matcher import LinearMatcher, Matcher, RadixMatcher
 from sirius.routing.router import Router
 
-__all__ = "Router"
+__all__ = (
+    "Limiter",
+    "LinearMatcher",
+    "Matcher",
+    "RadixMatcher",
+    "ResponseCache",
+    "Router",
+)
@@ -0,0 +1,87 @@
+import time
+from collections import OrderedDict
+from typing import Hashable
+
+from sirius.core.response import Response, StaticResponse, StreamingResponse
+
+CacheKey = tuple[
+    str, str, tuple[tuple[str, str], ...], tuple[tuple[str, tuple[str, ...]], ...]
+]
+
+
+def cache_key(
+    method: str, pattern: str, path_params: dict[str, str], query: dict[str, list[str]]
+) -> CacheKey:
+    """Key a response on the method, matched pattern, path params and the normalized query."""
+    return (
+        method,
+        pattern,
+        tuple(path_params.items()),
+        tuple(sorted((key, tuple(values)) for key, values in query.items())),
+    )
+
+
+class ResponseCache:
+    """
+    A bounded in-process cache of fully encoded responses, with a TTL and LRU eviction.
+
+    Route modules opt in with `CACHE_TTL = seconds` (and optionally `CACHE_MAX_ENTRIES = n`), or by
+    declaring `CACHE = ResponseCache(...)` themselves, which keeps a handle to call `invalidate()`
+    with, for example from a `post` handler in the same module.
+
+    Responses are keyed on the route params only, so handlers taking the `Request` are not cached:
+    their response may depend on headers such as `Authorization` or cookies.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 256) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries: OrderedDict[Hashable, tuple[float, Response]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Response | None:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires, response = entry
+        if expires < time.monotonic():
+            del self.entries[key]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return response
+
+    def set(self, key: Hashable, response: Response) -> Response:
+        """
+        Store `response` if it can be replayed, and return the response to send.
+
+        Only complete `200` responses are stored. They are frozen into a `StaticResponse`, so a hit
+        reuses the already built ASGI messages.
+        """
+        if isinstance(response, StreamingResponse) or response.start.status != 200:
+            return response
+        if not isinstance(response, StaticResponse):
+            response = StaticResponse(response.start, response.body)
+
+        self.entries[key] = (time.monotonic() + self.ttl, response)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return response
+
+    def invalidate(self, **path_params: str) -> None:
+        """Drop the cached responses matching `path_params`, or every response if none are given."""
+        if not path_params:
+            self.entries.clear()
+            return
+        wanted = {name: str(value) for name, value in path_params.items()}
+        for key in list(self.entries):
+            params = dict(key[2])
+            if all(params.get(name) == value for name, value in wanted.items()):
+                del self.entries[key]
+
+    def __len__(self) -> int:
+        return len(self.entries)
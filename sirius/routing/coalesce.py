@@ -0,0 +1,67 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable
+
+from sirius.core.response import (
+    SERVICE_UNAVAILABLE,
+    Response,
+    StaticResponse,
+    StreamingResponse,
+)
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent requests into a single handler call.
+
+    Route modules opt in with `COALESCE = True`. While a handler call is in flight, requests with
+    the same method, path params and query wait for its response instead of calling the handler
+    again, and get its exception if it raises. `COALESCE_TIMEOUT = seconds` bounds how long they
+    wait before being answered with a 503.
+
+    Only complete responses can be shared: when the handler streams its response, every waiting
+    request calls the handler itself. Handlers taking the `Request` are never coalesced, as their
+    response may depend on more than the key.
+    """
+
+    def __init__(self, timeout: float | None = None) -> None:
+        self.timeout = timeout
+        self.flights: dict[Hashable, asyncio.Future] = {}
+        self.coalesced = 0
+
+    async def do(
+        self, key: Hashable, call: Callable[[], Awaitable[Response]]
+    ) -> Response:
+        flight = self.flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            try:
+                # Shielded, so a waiter timing out or going away doesn't cancel the call
+                response = await asyncio.wait_for(asyncio.shield(flight), self.timeout)
+            except asyncio.TimeoutError:
+                return SERVICE_UNAVAILABLE
+            if response is None:
+                return await call()
+            return response
+
+        flight = self.flights[key] = asyncio.get_running_loop().create_future()
+        try:
+            response = await call()
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except BaseException as e:
+            flight.set_exception(e)
+            # Nobody may be waiting, which is fine
+            flight.exception()
+            raise
+        finally:
+            del self.flights[key]
+
+        if isinstance(response, StreamingResponse):
+            flight.set_result(None)
+            return response
+        if not isinstance(response, StaticResponse):
+            # Frozen, as each request may still attach its own headers to the response
+            response = StaticResponse(response.start, response.body)
+        flight.set_result(response)
+        return response
@@ -0,0 +1,111 @@
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable
+
+from sirius.core.request import Request
+from sirius.core.response import (
+    Response,
+    ResponseStart,
+    StaticResponse,
+    StreamingResponse,
+)
+
+
+def overloaded(retry_after: int) -> StaticResponse:
+    """Build the shared 503 response sent to requests a limit rejects."""
+    return StaticResponse(
+        start=ResponseStart(
+            status=503,
+            headers=[
+                (b"Content-Type", b"text/plain"),
+                (b"Retry-After", str(retry_after).encode("latin-1")),
+            ],
+        )
+    )
+
+
+class Limiter:
+    """
+    Bounds the number of requests handled at once.
+
+    Requests over `max_concurrency` wait in a first in, first out queue of at most `max_queue`
+    requests for up to `queue_timeout` seconds. Requests finding the queue full, or still queued
+    after the timeout, are shed with a 503 asking the client to retry after `retry_after` seconds.
+
+    Route modules declare their limit with `MAX_CONCURRENCY = n`, and may tune it with `MAX_QUEUE`,
+    `QUEUE_TIMEOUT` and `RETRY_AFTER`. The state is only touched from the event loop, so it isn't
+    locked. `active`, `depth` and `shed` can be read at any time.
+
+    A streamed response produces its body while it is sent, so its slot is only released once the
+    request is over, rather than when the handler returns.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue: int = 100,
+        queue_timeout: float | None = 5.0,
+        retry_after: int = 1,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.rejection = overloaded(retry_after)
+        self.active = 0
+        self.shed = 0
+        self.waiters: deque[asyncio.Future] = deque()
+
+    @property
+    def depth(self) -> int:
+        return len(self.waiters)
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting for one if needed. Returns `False` when the request is shed."""
+        if self.active < self.max_concurrency and not self.waiters:
+            self.active += 1
+            return True
+        if len(self.waiters) >= self.max_queue:
+            self.shed += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the wait ended, pass it on
+                self.release()
+            elif waiter in self.waiters:
+                self.waiters.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.shed += 1
+            return False
+        return True
+
+    def release(self) -> None:
+        # The slot goes straight to the next waiter, so nobody can jump the queue
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    async def run(
+        self, call: Callable[[], Awaitable[Response]], request: Request | None = None
+    ) -> Response:
+        """Await `call()` holding a slot, or return the 503 if the request is shed."""
+        if not await self.acquire():
+            return self.rejection
+        try:
+            response = await call()
+        except BaseException:
+            self.release()
+            raise
+        if isinstance(response, StreamingResponse) and request is not None:
+            request.call_after_response(self.release)
+        else:
+            self.release()
+        return response
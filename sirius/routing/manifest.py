@@ -0,0 +1,107 @@
+import compileall
+import json
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from sirius.utils import sentinel
+
+if TYPE_CHECKING:
+    from sirius.routing.router import Router
+
+DEFAULT_MANIFEST_FILENAME = "sirius-routes.json"
+MANIFEST_VERSION = 1
+
+
+def _directory_mtimes(route_folder: Path) -> dict[str, int]:
+    # Adding, removing or renaming a route file changes the mtime of its directory, so these are
+    # enough to tell whether the route table is still valid without listing any directory.
+    # Bytecode caches change whenever routes are imported, and are left out.
+    directories = [
+        route_folder,
+        *(
+            path
+            for path in route_folder.rglob("*")
+            if path.is_dir()
+            and "__pycache__" not in path.relative_to(route_folder).parts
+        ),
+    ]
+    cwd = Path.cwd()
+    return {
+        str(directory.relative_to(cwd)): directory.stat().st_mtime_ns
+        for directory in directories
+    }
+
+
+def build_manifest(router: "Router") -> dict:
+    """Describe the route table of an eagerly loaded `router`."""
+    routes = []
+    for route, module_path in router.module_paths.items():
+        methods = router.load_route(route)
+        routes.append(
+            {
+                "pattern": route,
+                "module": module_path,
+                "methods": {
+                    method: [
+                        {
+                            "name": name,
+                            "type": (
+                                getattr(convert, "__name__", "str")
+                                if convert is not None
+                                else "str"
+                            ),
+                            "required": required,
+                            "multi": multi,
+                        }
+                        for name, convert, required, multi in plan.params
+                    ]
+                    for method, plan in methods.items()
+                    if plan is not sentinel
+                },
+            }
+        )
+
+    # Writing the bytecode now creates the `__pycache__` folders, so the route folders keep their
+    # mtimes when workers import the routes later, even if importing here didn't write any
+    compileall.compile_dir(router.route_folder, quiet=2)
+    return {
+        "version": MANIFEST_VERSION,
+        "routes_path": router.routes_path,
+        "directories": _directory_mtimes(router.route_folder),
+        "routes": routes,
+    }
+
+
+def write_manifest(router: "Router", file: Path) -> Path:
+    file = Path(file)
+    file.write_text(json.dumps(build_manifest(router), indent=2))
+    return file
+
+
+def load_manifest(file: Path, routes_path: str) -> list[tuple[str, str]] | None:
+    """
+    Read the `(pattern, module path)` pairs from a manifest.
+
+    Returns `None` when there is no manifest, or when it was built for another routes folder or the
+    route folder changed since it was written, in which case the routes have to be discovered again.
+    """
+    try:
+        manifest = json.loads(Path(file).read_text())
+    except (OSError, ValueError):
+        return None
+
+    if (
+        manifest.get("version") != MANIFEST_VERSION
+        or manifest.get("routes_path") != routes_path
+    ):
+        return None
+
+    for directory, mtime in manifest["directories"].items():
+        try:
+            if os.stat(directory).st_mtime_ns != mtime:
+                return None
+        except OSError:
+            return None
+
+    return [(route["pattern"], route["module"]) for route in manifest["routes"]]
@@ -0,0 +1,125 @@
+from typing import Iterable, Protocol
+
+
+def split_path(path: str) -> list[str]:
+    stripped = path.strip("/")
+    if not stripped:
+        return []
+    return stripped.split("/")
+
+
+def match_path(pattern, path):
+    if pattern == path:
+        return {}
+    pattern_bits = pattern.strip("/").split("/")
+    path_bits = path.strip("/").split("/")
+    if len(pattern_bits) != len(path_bits):
+        return False
+    match = {}
+    for pattern_bit, path_bit in zip(pattern_bits, path_bits):
+        if pattern_bit.startswith("<") and pattern_bit.endswith(">"):
+            name = pattern_bit[1:-1]
+            match[name] = path_bit
+        elif pattern_bit != path_bit:
+            return False
+    return match
+
+
+class Matcher(Protocol):
+    """
+    A matcher resolves a request path to one of a fixed set of route patterns.
+    """
+
+    def __init__(self, patterns: Iterable[str]) -> None: ...
+
+    def match(self, path: str) -> tuple[str, dict[str, str]] | None:
+        """Return the matched pattern and its path params, or `None` on a miss."""
+        ...
+
+
+class LinearMatcher:
+    """
+    Tries `match_path` against every pattern in registration order.
+
+    This is the original matching behaviour, kept around for comparison with `RadixMatcher`.
+    """
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self.patterns: list[str] = list(patterns)
+
+    def match(self, path: str) -> tuple[str, dict[str, str]] | None:
+        for pattern in self.patterns:
+            params = match_path(pattern, path)
+            if params is not False:
+                return pattern, params
+        return None
+
+
+class _Node:
+    __slots__ = ("static", "param", "pattern", "param_names")
+
+    def __init__(self) -> None:
+        self.static: dict[str, _Node] = {}
+        self.param: _Node | None = None
+        self.pattern: str | None = None
+        self.param_names: tuple[str, ...] = ()
+
+
+class RadixMatcher:
+    """
+    A segment trie built once from the route patterns.
+
+    Static segments take precedence over `<param>` segments; if a static branch dead-ends the
+    lookup backtracks into the param branch at the same depth. Param names are kept on the
+    terminal node, so `/users/<id>` and `/users/<user_id>/posts` can share a branch.
+    """
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self.root = _Node()
+        for pattern in patterns:
+            self.add(pattern)
+
+    def add(self, pattern: str) -> None:
+        node = self.root
+        param_names: list[str] = []
+        for segment in split_path(pattern):
+            if segment.startswith("<") and segment.endswith(">"):
+                param_names.append(segment[1:-1])
+                if node.param is None:
+                    node.param = _Node()
+                node = node.param
+            else:
+                node = node.static.setdefault(segment, _Node())
+        # The first pattern registered for a path wins, like the linear scan
+        if node.pattern is None:
+            node.pattern = pattern
+            node.param_names = tuple(param_names)
+
+    def match(self, path: str) -> tuple[str, dict[str, str]] | None:
+        values: list[str] = []
+        node = self._lookup(self.root, split_path(path), 0, values)
+        if node is None:
+            return None
+        return node.pattern, dict(zip(node.param_names, values))
+
+    def _lookup(
+        self, node: _Node, segments: list[str], depth: int, values: list[str]
+    ) -> _Node | None:
+        if depth == len(segments):
+            return node if node.pattern is not None else None
+
+        segment = segments[depth]
+        child = node.static.get(segment)
+        if child is not None:
+            found = self._lookup(child, segments, depth + 1, values)
+            if found is not None:
+                return found
+
+        if node.param is not None:
+            values.append(segment)
+            found = self._lookup(node.param, segments, depth + 1, values)
+            if found is not None:
+                return found
+            values.pop()
+
+        return None
@@ -0,0 +1,229 @@
+import asyncio
+import inspect
+import types
+import typing
+from concurrent.futures import Executor
+from functools import partial
+from typing import Any, Callable
+
+from sirius.core.background import BackgroundTasks
+from sirius.core.request import Request
+from sirius.errors import ParamError
+from sirius.profiling import profiled_call, thread_profiles
+
+
+def _to_bool(value: str) -> bool:
+    lowered = value.lower()
+    if lowered in ("1", "true", "yes", "on"):
+        return True
+    if lowered in ("0", "false", "no", "off", ""):
+        return False
+    raise ValueError(f"{value!r} is not a boolean")
+
+
+# Converters for the annotations handlers use the most. `str` needs no conversion at all.
+FAST_CONVERTERS: dict[Any, Callable[[str], Any] | None] = {
+    str: None,
+    int: int,
+    float: float,
+    bool: _to_bool,
+    inspect.Parameter.empty: None,
+}
+
+
+def _unwrap_optional(annotation: Any) -> Any:
+    """Turn `T | None` / `Optional[T]` into `T`."""
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union or origin is types.UnionType:
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+
+def multi_valued(annotation: Any) -> tuple[bool, Any]:
+    """Tell whether a param collects every value of a repeated query key, and of which type."""
+    annotation = _unwrap_optional(annotation)
+    if annotation is list:
+        return True, str
+    if typing.get_origin(annotation) is list:
+        (item,) = typing.get_args(annotation) or (str,)
+        return True, item
+    return False, annotation
+
+
+def converter_for(annotation: Any) -> Callable[[str], Any] | None:
+    """Return the callable used to coerce a raw `str` param, or `None` to pass it through."""
+    annotation = _unwrap_optional(annotation)
+    if annotation in FAST_CONVERTERS:
+        return FAST_CONVERTERS[annotation]
+    if callable(annotation):
+        return annotation
+    return None
+
+
+class CallPlan:
+    """
+    The precompiled calling convention of a route handler.
+
+    Built once when the route module is imported so that binding request params is a loop over
+    `(name, converter, required, multi)` tuples with no introspection. Params annotated with
+    `list[T]` receive every value of a repeated query key, others the last one.
+
+    Coroutine functions are awaited on the event loop. Synchronous functions run on `executor`, or
+    directly on the event loop when `executor` is `None` (inline handlers).
+
+    A parameter annotated with `Request` receives the request itself, one annotated with
+    `BackgroundTasks` the tasks to run after the response is sent, and params named after an
+    application resource (see `provide`) receive that resource.
+    """
+
+    __slots__ = (
+        "function",
+        "params",
+        "names",
+        "var_keyword",
+        "request_param",
+        "tasks_param",
+        "resources",
+        "is_async",
+        "executor",
+    )
+
+    def __init__(
+        self,
+        function: Callable,
+        params: tuple[tuple[str, Callable[[str], Any] | None, bool, bool], ...],
+        var_keyword: bool = False,
+        request_param: str | None = None,
+        executor: Executor | None = None,
+        tasks_param: str | None = None,
+    ) -> None:
+        self.function = function
+        self.params = params
+        self.names: frozenset[str] = frozenset(name for name, *_ in params)
+        self.var_keyword = var_keyword
+        self.request_param = request_param
+        self.tasks_param = tasks_param
+        self.resources: tuple[tuple[str, Any], ...] = ()
+        self.is_async: bool = inspect.iscoroutinefunction(function)
+        self.executor = executor
+
+    @classmethod
+    def compile(
+        cls, function: Callable, executor: Executor | None = None
+    ) -> "CallPlan":
+        signature = inspect.signature(function)
+        try:
+            hints = typing.get_type_hints(function)
+        except Exception:
+            hints = {}
+
+        params = []
+        var_keyword = False
+        request_param = None
+        tasks_param = None
+        for parameter in signature.parameters.values():
+            if parameter.kind is inspect.Parameter.VAR_KEYWORD:
+                var_keyword = True
+                continue
+            if parameter.kind in (
+                inspect.Parameter.VAR_POSITIONAL,
+                inspect.Parameter.POSITIONAL_ONLY,
+            ):
+                continue
+            annotation = hints.get(parameter.name, parameter.annotation)
+            if annotation is Request:
+                request_param = parameter.name
+                continue
+            if annotation is BackgroundTasks:
+                tasks_param = parameter.name
+                continue
+            multi, annotation = multi_valued(annotation)
+            params.append(
+                (
+                    parameter.name,
+                    converter_for(annotation),
+                    parameter.default is inspect.Parameter.empty,
+                    multi,
+                )
+            )
+        return cls(
+            function, tuple(params), var_keyword, request_param, executor, tasks_param
+        )
+
+    def provide(self, resources: dict[str, Any]) -> None:
+        """
+        Inject the application `resources` into the params named after them.
+
+        Those params are no longer read from the request, so a client can't override them.
+        """
+        self.resources = tuple(
+            (name, resources[name]) for name in sorted(self.names) if name in resources
+        )
+        self.params = tuple(param for param in self.params if param[0] not in resources)
+
+    def bind(
+        self, raw: dict[str, str | list[str]], request: Request | None = None
+    ) -> dict[str, Any]:
+        """
+        Coerce the raw request params into keyword arguments for the handler.
+
+        Path params are given as `str`, query params as the `list` of all their values.
+        """
+        kwargs = {}
+        if self.request_param is not None:
+            kwargs[self.request_param] = request
+        if self.tasks_param is not None:
+            tasks = kwargs[self.tasks_param] = BackgroundTasks()
+            if request is not None:
+                request.background = tasks
+        for name, value in self.resources:
+            kwargs[name] = value
+        for name, convert, required, multi in self.params:
+            if name not in raw:
+                if required:
+                    raise ParamError(f"Missing required parameter {name!r}")
+                continue
+            value = raw[name]
+            try:
+                if multi:
+                    values = value if isinstance(value, list) else [value]
+                    value = (
+                        list(values)
+                        if convert is None
+                        else [convert(item) for item in values]
+                    )
+                else:
+                    if isinstance(value, list):
+                        value = value[-1]
+                    if convert is not None:
+                        value = convert(value)
+            except (TypeError, ValueError) as e:
+                raise ParamError(f"Invalid value for parameter {name!r}") from e
+            kwargs[name] = value
+
+        if self.var_keyword:
+            for name, value in raw.items():
+                if name not in self.names and name not in (
+                    self.request_param,
+                    self.tasks_param,
+                ):
+                    kwargs[name] = value[-1] if isinstance(value, list) else value
+        return kwargs
+
+    async def invoke(self, kwargs: dict[str, Any]) -> Any:
+        """Call the handler with already bound keyword arguments."""
+        if self.is_async:
+            return await self.function(**kwargs)
+        if self.executor is None:
+            return self.function(**kwargs)
+        call = partial(self.function, **kwargs)
+        profiles = thread_profiles.get()
+        if profiles is not None:
+            # The event loop's profiler doesn't see other threads
+            call = partial(profiled_call, call, profiles)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+
+    def __repr__(self) -> str:
+        return f"<CallPlan {self.function.__qualname__}>"
@@ -0,0 +1,48 @@
+from functools import lru_cache
+from urllib.parse import unquote_to_bytes
+
+# Query strings longer than this are parsed without going through the memo
+MAX_MEMOIZED_QUERY_LENGTH = 1024
+QUERY_MEMO_SIZE = 256
+
+QueryParams = dict[str, list[str]]
+
+
+def _decode(component: bytes) -> str:
+    if b"+" in component:
+        component = component.replace(b"+", b" ")
+    if b"%" in component:
+        component = unquote_to_bytes(component)
+    return component.decode("utf-8", "replace")
+
+
+def _parse_query(query: bytes) -> QueryParams:
+    params: QueryParams = {}
+    for pair in query.split(b"&"):
+        if not pair:
+            continue
+        # Split before decoding, so an encoded & or = stays part of the value
+        key, _, value = pair.partition(b"=")
+        key = _decode(key)
+        if key in params:
+            params[key].append(_decode(value))
+        else:
+            params[key] = [_decode(value)]
+    return params
+
+
+_parse_query_memo = lru_cache(maxsize=QUERY_MEMO_SIZE)(_parse_query)
+
+
+def parse_query(query: bytes) -> QueryParams:
+    """
+    Parse a raw query string into a mapping of keys to all of their values, in order.
+
+    Keys without `=` get an empty value. Recently seen query strings are answered from a small
+    memo, so the result is shared and must not be mutated.
+    """
+    if not query:
+        return {}
+    if len(query) > MAX_MEMOIZED_QUERY_LENGTH:
+        return _parse_query(query)
+    return _parse_query_memo(query)
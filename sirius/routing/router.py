@@ -1,54 +1,262 @@
+import asyncio
 import importlib
-import json
 import os
+import sys
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 from types import ModuleType
-from typing import Callable
-from urllib.parse import unquote_plus
-
-from sirius.core.response import Response, ResponseBody, ResponseStart
-from sirius.utils import METHODS, sentinel, _Sentinel, PATH_PARAMS_REGEX
-
-
-def match_path(pattern, path):
-    if pattern == path:
-        return {}
-    pattern_bits = pattern.strip("/").split("/")
-    path_bits = path.strip("/").split("/")
-    if len(pattern_bits) != len(path_bits):
-        return False
-    match = {}
-    for pattern_bit, path_bit in zip(pattern_bits, path_bits):
-        if pattern_bit.startswith("<") and pattern_bit.endswith(">"):
-            name = pattern_bit[1:-1]
-            match[name] = path_bit
-        elif pattern_bit != path_bit:
-            return False
-    return match
+from typing import Any, Iterable
+
+from sirius.core.conditional import (
+    etag_matches,
+    format_etag,
+    not_modified,
+    with_etag,
+)
+from sirius.core.request import Request
+from sirius.core.response import (
+    NOT_FOUND,
+    Response,
+    ResponseBody,
+    ResponseStart,
+    StaticResponse,
+    method_not_allowed,
+)
+from sirius.core.serialization import Serializer
+from sirius.errors import ParamError
+from sirius.metrics import Metrics
+from sirius.routing.cache import ResponseCache, cache_key
+from sirius.routing.coalesce import SingleFlight
+from sirius.routing.limits import Limiter
+from sirius.routing.manifest import load_manifest
+from sirius.routing.matcher import Matcher, RadixMatcher, match_path  # noqa: F401
+from sirius.routing.plan import CallPlan
+from sirius.routing.query import QueryParams, parse_query
+from sirius.utils import (
+    CACHEABLE_METHODS,
+    METHODS,
+    sentinel,
+    _Sentinel,
+    PATH_PARAMS_REGEX,
+)
 
 
 class Router:
     """
     A router is responsible for dispatching requests to the appropriate route.
+
+    Synchronous handlers run on `executor` so they never block the event loop. A route module can
+    opt out with `INLINE = True` for cheap handlers, or get a dedicated pool with `MAX_WORKERS = n`.
+
+    GET responses of modules setting `CACHE_TTL` (or `CACHE`, see `ResponseCache`) are cached.
+    Identical concurrent GET requests to modules setting `COALESCE = True` share one handler call,
+    see `SingleFlight`.
+
+    Handler calls of a route are bounded by the `Limiter` its module declares with
+    `MAX_CONCURRENCY = n`, or else by the one `limiters` gives for its pattern.
+
+    With `etags=True` GET responses are tagged with a hash of their body. A module can instead define
+    an `etag` function, taking the same params as its handlers and returning a cheap version string,
+    which lets a matching `If-None-Match` be answered with a 304 without calling the handler.
+
+    With `lazy=True` route modules are only imported when they are first requested, so startup
+    only has to walk the route folder.
+
+    Handler params named after an application resource given to `provide` receive that resource.
+
+    With `metrics`, the time spent matching and binding, waiting for a concurrency limiter slot, in
+    the handler and in serialization is recorded for each route pattern.
     """
 
-    def __init__(self, routes_path: str) -> None:
+    def __init__(
+        self,
+        routes_path: str,
+        matcher: type[Matcher] = RadixMatcher,
+        executor: Executor | None = None,
+        serializer: Serializer | None = None,
+        lazy: bool = False,
+        manifest: str | Path | None = None,
+        etags: bool = False,
+        metrics: Metrics | None = None,
+        limiters: dict[str, Limiter] | None = None,
+    ) -> None:
         self.routes_path: str = routes_path
+        self.etags = etags
+        self.metrics = metrics
+        self.serializer: Serializer = serializer or Serializer()
+        self.executor: Executor = executor or ThreadPoolExecutor(
+            thread_name_prefix="sirius"
+        )
         self.route_folder: str = self.find_route_folder()
 
-        self.routes: list[tuple[str, ModuleType]] = [
-            (route, module) for (route, module) in self.process_routes()
-        ]
-
-        # This creates a dictionary, where the key is the route and the value is a dictionary of methods and their corresponding functions
-        self.route_map: dict[str, dict[str, Callable | _Sentinel]] = {
-            route[0]: {method.lower(): sentinel for method in METHODS}
-            for route in self.routes
+        # Patterns and the module implementing them are known from the file system alone, or from
+        # a manifest written by `sirius build` while it is still up to date
+        routes = None
+        if manifest is not None:
+            routes = load_manifest(manifest, routes_path)
+        self.module_paths: dict[str, str] = dict(routes or self.discover_routes())
+        self.routes: list[tuple[str, ModuleType]] = []
+
+        # This creates a dictionary, where the key is the route and the value is a dictionary of methods and their corresponding call plans
+        self.route_map: dict[str, dict[str, CallPlan | _Sentinel]] = {}
+        self.not_allowed: dict[str, StaticResponse] = {}
+        self.caches: dict[str, ResponseCache] = {}
+        self.flights: dict[str, SingleFlight] = {}
+        self.configured_limiters: dict[str, Limiter] = dict(limiters or {})
+        self.limiters: dict[str, Limiter] = dict(self.configured_limiters)
+        self.versions: dict[str, CallPlan] = {}
+        # The dedicated pools of modules setting `MAX_WORKERS`, by module path
+        self.pools: dict[str, ThreadPoolExecutor] = {}
+        self.resources: dict[str, Any] = {}
+        self._import_locks: dict[str, threading.Lock] = {
+            route: threading.Lock() for route in self.module_paths
         }
 
-        for route, module in self.routes:
+        # The set of patterns only changes on `reload`, so the matcher is compiled once
+        self.matcher_class = matcher
+        self.matcher: Matcher = matcher(self.module_paths.keys())
+
+        self.lazy = lazy
+        if not lazy:
+            for route in self.module_paths:
+                self.load_route(route)
+
+    def load_route(self, route: str) -> dict[str, CallPlan | _Sentinel]:
+        """
+        Import the module behind `route` and compile its handlers, if that hasn't happened yet.
+
+        This is safe to call from several threads at once, the module is only imported once.
+        """
+        methods = self.route_map.get(route)
+        if methods is not None:
+            return methods
+
+        with self._import_locks[route]:
+            methods = self.route_map.get(route)
+            if methods is not None:
+                return methods
+
+            module = importlib.import_module(self.module_paths[route])
+            executor = self.executor_for(module)
+            methods = {}
             for method in [method.lower() for method in METHODS]:
-                self.route_map[route][method] = getattr(module, method, sentinel)
+                function = getattr(module, method, sentinel)
+                if function is not sentinel:
+                    function = CallPlan.compile(function, executor)
+                    if self.resources:
+                        function.provide(self.resources)
+                methods[method] = function
+
+            self.not_allowed[route] = method_not_allowed(
+                method for method, plan in methods.items() if plan is not sentinel
+            )
+            cache = self.cache_for(module)
+            if cache is not None:
+                self.caches[route] = cache
+            limiter = self.limiter_for(module)
+            if limiter is not None:
+                self.limiters[route] = limiter
+            if getattr(module, "COALESCE", False):
+                self.flights[route] = SingleFlight(
+                    getattr(module, "COALESCE_TIMEOUT", None)
+                )
+            version = getattr(module, "etag", None)
+            if callable(version):
+                version = self.versions[route] = CallPlan.compile(version, executor)
+                if self.resources:
+                    version.provide(self.resources)
+            self.routes.append((route, module))
+            # Published last, so other threads never see a half compiled route
+            self.route_map[route] = methods
+            return methods
+
+    def load_routes(self) -> None:
+        """Import every route that hasn't been loaded yet."""
+        for route in self.module_paths:
+            self.load_route(route)
+
+    def warm_up(self) -> threading.Thread:
+        """Import every route that hasn't been loaded yet on a background thread."""
+        thread = threading.Thread(
+            target=self.load_routes, name="sirius-warm-up", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def unload_route(self, route: str) -> None:
+        """Forget everything compiled or cached for `route`, so its module is imported anew."""
+        self.route_map.pop(route, None)
+        self.not_allowed.pop(route, None)
+        self.caches.pop(route, None)
+        self.versions.pop(route, None)
+        self.flights.pop(route, None)
+        if route in self.configured_limiters:
+            self.limiters[route] = self.configured_limiters[route]
+        else:
+            self.limiters.pop(route, None)
+        module_path = self.module_paths.get(route)
+        self.routes = [
+            (pattern, module) for pattern, module in self.routes if pattern != route
+        ]
+        sys.modules.pop(module_path, None)
+        pool = self.pools.pop(module_path, None)
+        if pool is not None:
+            # Calls already running on the pool finish, nothing new is accepted
+            pool.shutdown(wait=False)
+
+    def shutdown(self) -> None:
+        """Shut down the dedicated pools of route modules."""
+        pools, self.pools = self.pools, {}
+        for pool in pools.values():
+            pool.shutdown(wait=False)
+
+    def reload(self, modules: Iterable[str] = ()) -> set[str]:
+        """
+        Bring the routing table in line with the route folder, re-importing the `modules` given.
+
+        Added and removed route files are picked up. Routes whose module didn't change keep their
+        compiled handlers and warm caches. Returns the patterns that were (re)loaded or removed.
+        """
+        importlib.invalidate_caches()
+        discovered = dict(self.discover_routes())
+        modules = set(modules)
+        stale = {
+            route
+            for route, module_path in self.module_paths.items()
+            if discovered.get(route) != module_path or module_path in modules
+        }
+        for route in stale:
+            self.unload_route(route)
+        added = {route for route in discovered if route not in self.module_paths}
+
+        self.module_paths.clear()
+        self.module_paths.update(discovered)
+        for route in added:
+            self._import_locks[route] = threading.Lock()
+        if added or stale - set(discovered):
+            self.matcher = self.matcher_class(self.module_paths.keys())
+
+        changed = stale | added
+        if not self.lazy:
+            for route in changed & set(discovered):
+                self.load_route(route)
+        return changed
+
+    def provide(self, resources: dict[str, Any]) -> None:
+        """Inject application `resources` into the handlers of every route, loaded or not."""
+        self.resources = dict(resources)
+        for route in self.module_paths:
+            # Holding the import lock, a route being loaded either sees the resources or is done
+            with self._import_locks[route]:
+                methods = self.route_map.get(route, {})
+                for plan in methods.values():
+                    if plan is not sentinel:
+                        plan.provide(self.resources)
+                if route in self.versions:
+                    self.versions[route].provide(self.resources)
 
     def find_route_folder(self) -> Path:
         route_folder = Path.cwd() / self.routes_path
@@ -59,7 +267,21 @@ class Router:
                 f"Could not find {self.routes_path} folder in current working directory."
             )
 
-    def process_routes(self):
+    def executor_for(self, module: ModuleType) -> Executor | None:
+        """Pick the executor synchronous handlers of `module` should run on."""
+        if getattr(module, "INLINE", False):
+            return None
+        max_workers = getattr(module, "MAX_WORKERS", None)
+        if max_workers is not None:
+            pool = self.pools[module.__name__] = ThreadPoolExecutor(
+                max_workers=max_workers,
+                thread_name_prefix=f"sirius-{module.__name__}",
+            )
+            return pool
+        return self.executor
+
+    def discover_routes(self) -> list[tuple[str, str]]:
+        """Find the route patterns and the dotted paths of their modules, without importing them."""
         cwd = Path.cwd()
         python_files = [path for path in self.route_folder.rglob("*.py")]
         relative_routes = [str(path).removeprefix(str(cwd)) for path in python_files]
@@ -86,85 +308,165 @@ class Router:
                     (route.removesuffix(".py"), file_route.removeprefix("."))
                 )
 
+        return path_module_path_pairs
+
+    def cache_for(self, module: ModuleType) -> ResponseCache | None:
+        """Build the response cache a route module declares, if any."""
+        cache = getattr(module, "CACHE", None)
+        if isinstance(cache, ResponseCache):
+            return cache
+        ttl = getattr(module, "CACHE_TTL", None)
+        if ttl is None:
+            return None
+        return ResponseCache(ttl, getattr(module, "CACHE_MAX_ENTRIES", 256))
+
+    def limiter_for(self, module: ModuleType) -> Limiter | None:
+        """Build the concurrency limiter a route module declares, if any."""
+        max_concurrency = getattr(module, "MAX_CONCURRENCY", None)
+        if max_concurrency is None:
+            return None
+        return Limiter(
+            max_concurrency,
+            max_queue=getattr(module, "MAX_QUEUE", 100),
+            queue_timeout=getattr(module, "QUEUE_TIMEOUT", 5.0),
+            retry_after=getattr(module, "RETRY_AFTER", 1),
+        )
+
+    def process_routes(self) -> list[tuple[str, ModuleType]]:
         path_module_pairs: list[tuple[str, ModuleType]] = [
             (path, importlib.import_module(module_path))
-            for (path, module_path) in path_module_path_pairs
+            for (path, module_path) in self.discover_routes()
         ]
         return path_module_pairs
 
-    def route(self, method: str, route: str, query: str) -> Response:
+    async def route(
+        self, method: str, route: str, query: bytes, request: Request | None = None
+    ) -> Response:
+        metrics = self.metrics
+        if metrics is not None:
+            started = time.perf_counter()
+
+        match = self.matcher.match(route)
 
-        if all(
-            [match_path(pattern, route) is False for pattern in self.route_map.keys()]
-        ):
+        if match is None:
+            return NOT_FOUND
+
+        pattern, path_params = match
+        if request is not None:
+            request.route = pattern
+
+        methods = self.route_map.get(pattern)
+        if methods is None:
+            loading = time.perf_counter()
+            methods = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.load_route, pattern
+            )
+            if metrics is not None:
+                # Importing the module happens once, it isn't part of routing the request
+                started += time.perf_counter() - loading
+
+        plan = methods.get(method, sentinel)
+        if plan is sentinel:
+            return self.not_allowed[pattern]
+
+        query_params: QueryParams = self.get_params(query)
+
+        key = None
+        # Handlers taking the request may answer differently with the same params, from its
+        # headers for instance, so their responses are never replayed to other clients
+        cache = (
+            self.caches.get(pattern)
+            if method in CACHEABLE_METHODS and plan.request_param is None
+            else None
+        )
+        if cache is not None:
+            key = cache_key(method, pattern, path_params, query_params)
+            response = cache.get(key)
+            if response is not None:
+                return response
+
+        raw_params: dict[str, str | list[str]] = query_params | path_params
+        conditional = self.etags and method in CACHEABLE_METHODS
+        etag = None
+
+        try:
+            params = plan.bind(raw_params, request)
+            if metrics is not None:
+                metrics.observe(pattern, "route", time.perf_counter() - started)
+            if conditional and pattern in self.versions:
+                version = self.versions[pattern]
+                etag = format_etag(
+                    await version.invoke(version.bind(raw_params, request))
+                )
+        except ParamError as e:
             return Response(
                 start=ResponseStart(
-                    status=404,
-                    headers=[
-                        (b"Content-Type", b"text/plain"),
-                        (b"Content-Length", b"0"),
-                    ],
-                )
+                    status=400, headers=[(b"Content-Type", b"text/plain")]
+                ),
+                body=ResponseBody(body=str(e).encode("utf-8")),
             )
 
-        for pattern in self.route_map.keys():
-            if match_path(pattern, route) is not False:
-                path = pattern
-                path_params = match_path(pattern, route)
-                break
-
-        if method not in self.route_map[path]:
-            raise KeyError(f"Method {method} not found")
-
-        params: dict[str, str] = self.get_params(query)
-        params: dict[str, str] = params | path_params
-
-        route = self.route_map[pattern]
-        function = route.get(method)
-        function_annotations = function.__annotations__
-
-        for param in params.keys():
-            parameter = function_annotations.get(param, None)
-            if parameter is None:
-                raise KeyError(f"Parameter {param} not found")
-            params[param] = parameter(params[param])
-
-        response_body = function(**params)
-
-        content_type = b"text/plain"
-        status_code = 200
-
-        match response_body:
-            case str(response):
-                response_body = response.encode("utf-8")
-            case dict(response):
-                content_type = b"application/json"
-            case int(response):
-                status_code = response
-            case (str(response), int(code)):
-                status_code = code
-                response_body = response.encode("utf-8")
-            case (dict(response), int(code)):
-                content_type = b"application/json"
-                status_code = code
-                response_body = json.dumps(response).encode("utf-8")
-
-        return Response(
-            start=ResponseStart(
-                status=status_code, headers=[(b"Content-Type", content_type)]
-            ),
-            body=ResponseBody(body=response_body, more_body=False),
+        if etag is not None and request is not None:
+            if_none_match = request.header(b"if-none-match")
+            if if_none_match is not None and etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+        # Synchronous handlers can't await the body, so it is spooled for them beforehand
+        if plan.request_param is not None and not plan.is_async and request is not None:
+            await request.load()
+
+        limiter = self.limiters.get(pattern)
+        queued = None
+        if metrics is not None and limiter is not None:
+            queued = time.perf_counter()
+        call = partial(self.call, plan, params, pattern, conditional, etag, queued)
+        if limiter is not None:
+            call = partial(limiter.run, call, request)
+        flight = (
+            self.flights.get(pattern)
+            if method in CACHEABLE_METHODS and plan.request_param is None
+            else None
         )
-
-    def get_params(self, query) -> dict:
-        query = unquote_plus(query.decode("utf-8"))
-
-        params = query.split("&")
-        if isinstance(params, str):
-            params = [
-                params,
-            ]
-
-        params = [param.split("=") for param in params if param != ""]
-
-        return {param[0]: param[1] for param in params}
+        if flight is None:
+            response = await call()
+        else:
+            if key is None:
+                key = cache_key(method, pattern, path_params, query_params)
+            response = await flight.do(key, call)
+        if cache is not None:
+            response = cache.set(key, response)
+        return response
+
+    async def call(
+        self,
+        plan: CallPlan,
+        params: dict[str, Any],
+        pattern: str,
+        conditional: bool,
+        etag: bytes | None,
+        queued: float | None = None,
+    ) -> Response:
+        """
+        Call the handler with bound `params` and turn its return value into a response.
+
+        `queued` is when the call was handed to the route's limiter, to time the wait for a slot.
+        """
+        metrics = self.metrics
+        if metrics is None:
+            response_body = await plan.invoke(params)
+            response = self.serializer(response_body, plan.executor)
+        else:
+            invoked = time.perf_counter()
+            response_body = await plan.invoke(params)
+            serializing = time.perf_counter()
+            response = self.serializer(response_body, plan.executor)
+            if queued is not None:
+                metrics.observe(pattern, "queue", invoked - queued)
+            metrics.observe(pattern, "handler", serializing - invoked)
+            metrics.observe(pattern, "serialize", time.perf_counter() - serializing)
+        if conditional:
+            response = with_etag(response, etag)
+        return response
+
+    def get_params(self, query: bytes) -> QueryParams:
+        return parse_query(query)
@@ -0,0 +1,173 @@
+import contextlib
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+from multiprocessing.context import SpawnProcess
+from pathlib import Path
+from typing import Iterator
+
+import uvicorn
+
+from sirius.config.config import ServerConfig, update_config
+
+APP = "sirius.sirius:sirius"
+
+# Workers dying within this many seconds of being started are counted as failing to start
+STARTUP_WINDOW = 5.0
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    """Create the listening socket shared by every worker."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+@contextlib.contextmanager
+def worker_process(config_file: str | None) -> Iterator[None]:
+    """Set up a spawned server process to load and serve the project, for the duration of the block."""
+    if config_file is not None:
+        update_config(Path(config_file))
+    # Route modules are imported relative to the project root
+    sys.path.insert(0, str(Path.cwd()))
+    # A Ctrl+C reaches the whole process group, the parent takes care of reporting it
+    with contextlib.suppress(KeyboardInterrupt):
+        yield
+
+
+def run_worker(
+    app: str, sock: socket.socket, server: ServerConfig, config_file: str | None
+) -> None:
+    """Entry point of a worker process: serve `app` on the inherited socket."""
+    with worker_process(config_file):
+        worker = uvicorn.Server(
+            uvicorn.Config(
+                app,
+                backlog=server.backlog,
+                timeout_keep_alive=server.keep_alive,
+            )
+        )
+        worker.run(sockets=[sock])
+
+
+class Supervisor:
+    """
+    Pre-forks `server.workers` worker processes sharing one listening socket, restarts workers that
+    die, and on SIGINT/SIGTERM gives them `server.graceful_timeout` seconds to finish in-flight
+    requests before killing them.
+
+    Workers that keep failing to start, on a broken route or configuration for instance, are
+    restarted with an exponential backoff, and the supervisor gives up after `max_failed_starts`
+    failures in a row.
+    """
+
+    poll_interval = 0.5
+    restart_delay = 0.5
+    max_restart_delay = 30.0
+    max_failed_starts = 5
+
+    def __init__(
+        self, server: ServerConfig, app: str = APP, config_file: str | None = None
+    ) -> None:
+        self.server = server
+        self.app = app
+        self.config_file = config_file
+        self.workers_count = server.workers or os.cpu_count() or 1
+        self.context = multiprocessing.get_context("spawn")
+        self.processes: list[SpawnProcess] = []
+        # When each worker was started, or is due to be started again, and its failed starts in a row
+        self.started: list[float] = []
+        self.restart_at: list[float | None] = []
+        self.failed_starts: list[int] = []
+        self.should_exit = False
+        self.gave_up = False
+
+    def spawn(self, sock: socket.socket) -> SpawnProcess:
+        process = self.context.Process(
+            target=run_worker,
+            args=(self.app, sock, self.server, self.config_file),
+            daemon=False,
+        )
+        process.start()
+        return process
+
+    def handle_exit(self, signum, frame) -> None:  # noqa: ANN001
+        self.should_exit = True
+
+    def run(self) -> None:
+        sock = bind_socket(self.server.host, self.server.port, self.server.backlog)
+        signal.signal(signal.SIGINT, self.handle_exit)
+        signal.signal(signal.SIGTERM, self.handle_exit)
+
+        print(
+            f"Serving on http://{self.server.host}:{self.server.port} "
+            f"with {self.workers_count} workers (pid {os.getpid()}).",
+            file=sys.stderr,
+        )
+        self.processes = [self.spawn(sock) for _ in range(self.workers_count)]
+        self.started = [time.monotonic()] * self.workers_count
+        self.restart_at = [None] * self.workers_count
+        self.failed_starts = [0] * self.workers_count
+
+        try:
+            while not self.should_exit:
+                for index, process in enumerate(self.processes):
+                    if not process.is_alive():
+                        self.restart(index, sock)
+                time.sleep(self.poll_interval)
+        finally:
+            self.shutdown()
+            sock.close()
+
+    def restart(self, index: int, sock: socket.socket) -> None:
+        """Start the dead worker `index` again, once its backoff delay has passed."""
+        now = time.monotonic()
+        if self.restart_at[index] is None:
+            if now - self.started[index] < STARTUP_WINDOW:
+                self.failed_starts[index] += 1
+            else:
+                self.failed_starts[index] = 1
+            failures = self.failed_starts[index]
+            if failures >= self.max_failed_starts:
+                print(
+                    f"Workers failed to start {failures} times in a row, giving up.",
+                    file=sys.stderr,
+                )
+                self.gave_up = self.should_exit = True
+                return
+            delay = min(
+                self.restart_delay * 2 ** (failures - 1), self.max_restart_delay
+            )
+            self.restart_at[index] = now + delay
+        if now < self.restart_at[index]:
+            return
+
+        self.processes[index] = self.spawn(sock)
+        self.started[index] = now
+        self.restart_at[index] = None
+
+    def shutdown(self) -> None:
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+
+        deadline = time.monotonic() + self.server.graceful_timeout
+        for process in self.processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+                process.join()
+
+
+def serve(server: ServerConfig, app: str = APP, config_file: str | None = None) -> None:
+    supervisor = Supervisor(server, app, config_file)
+    supervisor.run()
+    if supervisor.gave_up:
+        sys.exit(1)
@@ -1,37 +1,379 @@
-from dataclasses import asdict
+import asyncio
+import time
+import traceback
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any
 
+from sirius.batch import Batch
+from sirius.config.config import Cfg, get_user_config
 from sirius.core import Request, Response
-from sirius.routing import Router
+from sirius.core import conditional
+from sirius.core.background import TaskRunner
+from sirius.core.compression import Compressor
+from sirius.core.files import FileResponse, StaticFiles
+from sirius.core.response import (
+    CLIENT_CLOSED_REQUEST,
+    PAYLOAD_TOO_LARGE,
+    StreamingResponse,
+)
+from sirius.core.serialization import Serializer, load_encoder
+from sirius.errors import ClientDisconnect, PayloadTooLargeError
+from sirius.lifespan import Lifespan
+from sirius.metrics import UNMATCHED, Metrics
+from sirius.profiling import Profiler
+from sirius.routing import Limiter, Router
 from sirius.types import Scope, Receive, Send
+from sirius.utils import CACHEABLE_METHODS
 
 
 class Sirius:
     def __init__(
         self,
         debug: bool | None = False,
+        config: Cfg | None = None,
     ) -> None:
         self._debug = debug
+        self.config: Cfg = config or get_user_config()
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.config.executor.max_workers,
+            thread_name_prefix="sirius",
+        )
+        self.metrics: Metrics | None = (
+            Metrics() if self.config.metrics.enabled else None
+        )
+        limits = self.config.limits
+
+        def limiter(max_concurrency: int) -> Limiter:
+            return Limiter(
+                max_concurrency,
+                max_queue=limits.max_queue,
+                queue_timeout=limits.queue_timeout,
+                retry_after=limits.retry_after,
+            )
+
+        self.limiter: Limiter | None = (
+            limiter(limits.max_concurrency) if limits.max_concurrency else None
+        )
         self.router = Router(
-            "src/routes"
-        )  # TODO: when configuration is implemented, this should be a configurable value
+            self.config.routing.path,
+            executor=self.executor,
+            serializer=Serializer(load_encoder(self.config.json.encoder)),
+            lazy=self.config.routing.lazy,
+            manifest=self.config.routing.manifest,
+            etags=self.config.etag.enabled,
+            metrics=self.metrics,
+            limiters={
+                pattern: limiter(max_concurrency)
+                for pattern, max_concurrency in limits.routes.items()
+            },
+        )
+        if self.metrics is not None:
+            self.metrics.watch(self.router.limiters)
+            if self.limiter is not None:
+                self.metrics.watch({"global": self.limiter})
+        compression = self.config.compression
+        self.compressor: Compressor | None = (
+            Compressor(
+                level=compression.level,
+                min_size=compression.min_size,
+                content_types=compression.content_types,
+            )
+            if compression.enabled
+            else None
+        )
+        profiling = self.config.profiling
+        self.profiler: Profiler | None = (
+            Profiler(
+                profiling.directory,
+                sample_rate=profiling.sample_rate,
+                header=profiling.header.encode("latin-1"),
+            )
+            if profiling.sample_rate > 0 or profiling.header
+            else None
+        )
+        static = self.config.static
+        self.static: StaticFiles | None = (
+            StaticFiles(
+                static.path,
+                prefix=static.prefix,
+                stat_ttl=static.stat_ttl,
+                max_entries=static.max_entries,
+            )
+            if static.path and (Path.cwd() / static.path).is_dir()
+            else None
+        )
+        batch = self.config.batch
+        self.batch: Batch | None = (
+            Batch(
+                self,
+                batch.path,
+                max_concurrency=batch.max_concurrency,
+                max_items=batch.max_items,
+            )
+            if batch.path
+            else None
+        )
+        background = self.config.background
+        self.tasks = TaskRunner(
+            ThreadPoolExecutor(
+                max_workers=background.max_workers,
+                thread_name_prefix="sirius-background",
+            ),
+            max_tasks=background.max_tasks,
+        )
+        self.lifespan = Lifespan.discover(self.config.routing.path)
+        self.resources: dict[str, Any] = {}
+        if self.config.routing.lazy and self.config.routing.warm_up:
+            self.router.warm_up()
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self.serve_lifespan(receive, send)
+            return
         assert scope["type"] == "http"
 
-        request: Request = await Request.from_request(scope, receive)
-        response = self.router.route(
-            request.scope.method.lower(), request.scope.path, request.scope.query_string
+        request = Request(
+            scope,
+            receive,
+            max_body_size=self.config.request.max_body_size,
+            spool_threshold=self.config.request.spool_threshold,
+        )
+        metrics = self.metrics
+        if metrics is None:
+            try:
+                response = await self.handle(request)
+                if response is not CLIENT_CLOSED_REQUEST:
+                    await self.respond(send, response, request)
+            finally:
+                request.finish()
+            if request.background:
+                self.tasks.submit(request.background)
+            return
+
+        if request.path == self.config.metrics.path:
+            await self.respond(send, metrics.response())
+            return
+
+        started = time.perf_counter()
+        try:
+            response = await self.handle(request)
+            sending = time.perf_counter()
+            # The client is gone, the status only shows in the metrics
+            if response is not CLIENT_CLOSED_REQUEST:
+                await self.respond(send, response, request)
+        except Exception:
+            metrics.record(
+                request.route or UNMATCHED, 500, time.perf_counter() - started
+            )
+            raise
+        finally:
+            request.finish()
+        finished = time.perf_counter()
+        pattern = request.route or UNMATCHED
+        metrics.observe(pattern, "send", finished - sending)
+        metrics.record(pattern, response.start.status, finished - started)
+        if request.background:
+            self.tasks.submit(request.background)
+
+    async def serve_lifespan(self, receive: Receive, send: Send) -> None:
+        """Answer the ASGI lifespan protocol, running the startup and shutdown hooks."""
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception:
+                    await send(
+                        {
+                            "type": "lifespan.startup.failed",
+                            "message": traceback.format_exc(),
+                        }
+                    )
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                try:
+                    await self.shutdown()
+                except Exception:
+                    await send(
+                        {
+                            "type": "lifespan.shutdown.failed",
+                            "message": traceback.format_exc(),
+                        }
+                    )
+                    return
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def startup(self) -> None:
+        """Create the application resources and get routes ready before serving requests."""
+        self.resources = await self.lifespan.startup()
+        routing = self.config.routing
+        if routing.lazy and routing.warm_up:
+            # Finish importing and compiling routes, so no request pays for it
+            await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.router.load_routes
+            )
+        if self.resources:
+            self.router.provide(self.resources)
+
+    async def shutdown(self) -> None:
+        # Background tasks may still need the resources
+        await self.tasks.drain(self.config.background.drain_timeout)
+        try:
+            await self.lifespan.shutdown(self.resources)
+        finally:
+            # Threads still busy finish what they are doing, nothing new is accepted
+            self.router.shutdown()
+            self.executor.shutdown(wait=False)
+            self.tasks.executor.shutdown(wait=False)
+
+    async def handle(self, request: Request) -> Response:
+        """Route `request` and return the response to send, without sending it."""
+        method = request.method.lower()
+        try:
+            request.check_content_length()
+            if self.limiter is None:
+                response = await self.route(request, method)
+            else:
+                response = await self.limiter.run(
+                    partial(self.route, request, method), request
+                )
+        except PayloadTooLargeError:
+            response = PAYLOAD_TOO_LARGE
+        except ClientDisconnect:
+            # Nobody is left to answer, callers record it without sending it
+            return CLIENT_CLOSED_REQUEST
+
+        # Files handle their own conditional requests and ranges, and are sent as they are
+        if isinstance(response, FileResponse):
+            return response.evaluate(request, self.executor)
+        if self.config.etag.enabled and method in CACHEABLE_METHODS:
+            response = conditional.evaluate(request.header(b"if-none-match"), response)
+        if self.compressor is not None:
+            response = self.compressor(request.header(b"accept-encoding"), response)
+        return response
+
+    async def route(self, request: Request, method: str) -> Response:
+        if self.batch is not None and request.path == self.batch.path:
+            request.route = self.batch.path
+            return await self.batch(request)
+        if self.static is not None and method in CACHEABLE_METHODS:
+            response = self.static.lookup(request.path)
+            if response is not None:
+                request.route = self.static.prefix
+                return response
+        routed = self.router.route(
+            method,
+            request.path,
+            request.query_string,
+            request,
         )
-        await self.respond(send, response)
+        if self.profiler is not None and self.profiler.wanted(request):
+            return await self.profiler.profile(request, routed)
+        return await routed
+
+    async def respond(
+        self, send: Send, response: Response, request: Request | None = None
+    ) -> None:
+        if isinstance(response, FileResponse) and response.pathsend:
+            await send(response.start.message())
+            await send({"type": "http.response.pathsend", "path": response.path})
+            return
+        if isinstance(response, StreamingResponse):
+            await self.respond_stream(send, response, request)
+            return
+
+        start, body = response.messages()
+        await send(start)
+        await send(body)
+
+    async def respond_stream(
+        self, send: Send, response: StreamingResponse, request: Request | None
+    ) -> None:
+        """
+        Send each chunk of a streamed response as its own body message.
+
+        Iteration stops as soon as the client disconnects, either noticed through a
+        `http.disconnect` message, through `send` failing or through the stream reading the
+        request body raising `ClientDisconnect`.
+        """
+        disconnected = asyncio.Event()
+
+        async def listen() -> None:
+            # The request keeps the body messages received meanwhile for the stream to read
+            await request.disconnected()
+            disconnected.set()
+
+        listener = asyncio.create_task(listen()) if request is not None else None
+        stream = response.stream
+        compressor = response.compressor
+        try:
+            await send(response.start.message())
+            async for chunk in self._iterate(stream, response.executor):
+                if disconnected.is_set():
+                    return
+                if isinstance(chunk, str):
+                    chunk = chunk.encode("utf-8")
+                if compressor is not None:
+                    # Flushing per chunk keeps the stream incremental for the client
+                    chunk = compressor.compress(chunk) + compressor.flush(
+                        zlib.Z_SYNC_FLUSH
+                    )
+                await send(
+                    {"type": "http.response.body", "body": chunk, "more_body": True}
+                )
+            if not disconnected.is_set():
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": compressor.flush() if compressor is not None else b"",
+                        "more_body": False,
+                    }
+                )
+        except (OSError, ClientDisconnect):
+            # The server reports a closed connection by failing the send
+            return
+        finally:
+            if listener is not None:
+                listener.cancel()
+            if hasattr(stream, "aclose"):
+                await stream.aclose()
+            elif hasattr(stream, "close"):
+                stream.close()
+
+    @staticmethod
+    async def _iterate(stream, executor):
+        if hasattr(stream, "__aiter__"):
+            async for chunk in stream:
+                yield chunk
+            return
+
+        iterator = iter(stream)
+        if executor is None:
+            for chunk in iterator:
+                yield chunk
+            return
 
-    async def respond(self, send: Send, response: Response) -> None:
-        response = asdict(response)
-        await send(response["start"])
-        await send(response["body"])
+        loop = asyncio.get_running_loop()
+        done = object()
+        while (
+            chunk := await loop.run_in_executor(executor, next, iterator, done)
+        ) is not done:
+            yield chunk
 
     @property
     def debug(self) -> bool:
         return self._debug
 
 
-sirius = Sirius()
+def __getattr__(name: str) -> Any:
+    # The application of the project is built on first use, from the user configuration, so
+    # importing `Sirius` doesn't need a project around it
+    if name == "sirius":
+        app = globals()["sirius"] = Sirius()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
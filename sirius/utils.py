@@ -7,6 +7,9 @@ sentinel = _Sentinel()
 
 METHODS = ["GET", "POST", "PUT", "DELETE", "HEAD", "OPTIONS", "TRACE"]
 
+# Lowercase, as methods are passed to the router
+CACHEABLE_METHODS = frozenset({"get", "head"})
+
 DEFAULT_IGNORE_FILES = [
     "__init__.py",
     "__main__.py",
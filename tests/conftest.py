@@ -0,0 +1,75 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+
+@pytest.fixture
+def routes(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """Build a throwaway `src/routes` tree in a temporary working directory.
+
+    Returns a function taking a mapping of route file paths (relative to `src/routes`) to
+    their source code.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    def make(files: dict[str, str]) -> Path:
+        route_folder = tmp_path / "src" / "routes"
+        route_folder.mkdir(parents=True, exist_ok=True)
+        (tmp_path / "src" / "__init__.py").touch()
+        for name, source in files.items():
+            path = route_folder / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(source)
+        return route_folder
+
+    yield make
+
+    for name in [name for name in sys.modules if name.split(".")[0] == "src"]:
+        del sys.modules[name]
+
+
+def call(
+    app,
+    method: str = "GET",
+    path: str = "/",
+    query: bytes = b"",
+    body: bytes = b"",
+    headers=(),
+    messages=None,
+):
+    """Drive an ASGI app with a single HTTP request and return the messages it sent.
+
+    `messages` replaces the single message carrying `body` as what the app receives.
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query,
+        "root_path": "",
+        "headers": [(name.lower(), value) for name, value in headers],
+        "client": ("127.0.0.1", 5000),
+        "server": ("127.0.0.1", 8080),
+    }
+    sent = []
+    if messages is None:
+        messages = [{"type": "http.request", "body": body, "more_body": False}]
+    messages = list(messages)
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent
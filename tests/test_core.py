@@ -0,0 +1,91 @@
+import gzip
+import json
+from dataclasses import dataclass
+
+import pytest
+
+from sirius.core.compression import Compressor, negotiate
+from sirius.core.response import StaticResponse, StreamingResponse
+from sirius.core.serialization import Serializer, load_encoder
+
+
+@dataclass
+class Planet:
+    name: str
+    moons: int
+
+
+def test_serializer_encodes_json_returns():
+    serialize = Serializer()
+    response = serialize({"name": "Sirius", "magnitude": -1.46})
+    assert (b"Content-Type", b"application/json") in response.start.headers
+    assert response.body.body == b'{"name":"Sirius","magnitude":-1.46}'
+    assert serialize(([1, 2], 201)).start.status == 201
+    for listed in ([1, 2], ["a", 404]):
+        response = serialize(listed)
+        assert response.start.status == 200
+        assert response.body.body == json.dumps(listed, separators=(",", ":")).encode()
+    assert serialize(Planet("Mars", 2)).body.body == b'{"name":"Mars","moons":2}'
+    assert serialize(204).start.status == 204
+    assert serialize(iter(["a"])).__class__ is StreamingResponse
+
+
+def test_serializer_uses_pluggable_encoder():
+    pytest.importorskip("orjson")
+    orjson = Serializer(load_encoder("orjson"))
+    assert orjson({"planet": Planet("Mars", 2)}).body.body == (
+        b'{"planet":{"name":"Mars","moons":2}}'
+    )
+    custom = Serializer(load_encoder("json:dumps"))
+    assert custom({"a": 1}).body.body == b'{"a": 1}'
+
+
+def test_compressor_negotiates_and_reuses_variants():
+    assert negotiate(b"deflate, gzip;q=0.5") == "deflate"
+    assert negotiate(b"gzip;q=0, br") is None
+
+    compress = Compressor(min_size=10)
+    response = Serializer()({"planets": ["Mercury"] * 50})
+    compressed = compress(b"gzip, deflate", response)
+    headers = dict(compressed.start.headers)
+    assert headers[b"Content-Encoding"] == b"gzip"
+    assert gzip.decompress(compressed.body.body) == response.body.body
+    assert headers[b"Content-Length"] == str(len(compressed.body.body)).encode()
+    assert headers[b"Vary"] == b"Accept-Encoding"
+    # Caches must not hand the uncompressed response to clients accepting gzip
+    identity = compress(None, response)
+    assert identity.body is response.body
+    assert dict(identity.start.headers)[b"Vary"] == b"Accept-Encoding"
+    tiny = compress(b"gzip", Serializer()("tiny"))
+    assert tiny.body.body == b"tiny"
+    assert b"Vary" not in dict(tiny.start.headers)
+
+    shared = StaticResponse(response.start, response.body)
+    assert compress(b"gzip", shared) is compress(b"gzip", shared)
+    assert compress(None, shared) is compress(None, shared)
+
+
+def test_request_view():
+    import copy
+
+    from sirius.core import Request
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/users/1",
+        "query_string": b"a=1",
+        "headers": [(b"accept", b"text/html"), (b"X-Tag", b"1"), (b"x-tag", b"2")],
+    }
+    original = copy.deepcopy(scope)
+    request = Request(scope, {"type": "http.request", "body": b"", "more_body": False})
+    assert (request.method, request.path, request.query_string) == (
+        "GET",
+        "/users/1",
+        b"a=1",
+    )
+    assert request.header(b"X-TAG") == b"1"
+    assert request.header(b"missing") is None
+    assert request.scope.path == "/users/1" and request.scope.http_version == "1.1"
+    assert scope == original and request.asgi_scope is scope
+    assert not hasattr(request, "__dict__")
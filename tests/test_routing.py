@@ -0,0 +1,362 @@
+import asyncio
+import sys
+
+import pytest
+
+from sirius.core import Request
+from sirius.core.response import NOT_FOUND
+from sirius.errors import ParamError
+from sirius.routing import LinearMatcher, RadixMatcher, Router
+from sirius.routing.manifest import load_manifest, write_manifest
+from sirius.routing.plan import CallPlan
+from sirius.routing.query import parse_query
+
+PATTERNS = ["/", "/users", "/users/<id>", "/users/me", "/users/<id>/posts/<post>"]
+
+
+@pytest.mark.parametrize("matcher", [LinearMatcher, RadixMatcher])
+def test_matcher_hits_and_misses(matcher):
+    m = matcher(PATTERNS)
+    assert m.match("/") == ("/", {})
+    assert m.match("/users/") == ("/users", {})
+    assert m.match("/users/42") == ("/users/<id>", {"id": "42"})
+    assert m.match("/users/1/posts/2") == (
+        "/users/<id>/posts/<post>",
+        {"id": "1", "post": "2"},
+    )
+    assert m.match("/nope") is None
+    assert m.match("/users/1/posts") is None
+
+
+def test_radix_matcher_prefers_static_segments():
+    m = RadixMatcher(["/users/<id>", "/users/me"])
+    assert m.match("/users/me") == ("/users/me", {})
+    m = RadixMatcher(["/users/me", "/<section>/profile"])
+    # A dead-end static branch falls back to the param branch at the same depth
+    assert m.match("/users/profile") == ("/<section>/profile", {"section": "users"})
+
+
+def test_router_uses_matcher(routes):
+    routes(
+        {
+            "__init__.py": "def get():\n    return 'root'\n",
+            "users/__init__.py": "",
+            "users/<id>.py": "def get(id: int):\n    return str(id * 2)\n",
+        }
+    )
+    for matcher in (LinearMatcher, RadixMatcher):
+        router = Router("src/routes", matcher=matcher)
+        response = asyncio.run(router.route("get", "/users/21", b""))
+        assert response.body.body == b"42"
+        response = asyncio.run(router.route("get", "/missing", b""))
+        assert response.start.status == 404
+
+
+def test_call_plan_binds_params():
+    def handler(id: int, ratio: float, flag: bool, name, limit: int | None = 10): ...
+
+    plan = CallPlan.compile(handler)
+    assert plan.bind({"id": "3", "ratio": "0.5", "flag": "true", "name": "x"}) == {
+        "id": 3,
+        "ratio": 0.5,
+        "flag": True,
+        "name": "x",
+    }
+    assert (
+        plan.bind({"id": "3", "ratio": "1", "flag": "0", "name": "x", "limit": "5"})[
+            "limit"
+        ]
+        == 5
+    )
+    with pytest.raises(ParamError):
+        plan.bind({"id": "3"})
+    with pytest.raises(ParamError):
+        plan.bind({"id": "x", "ratio": "1", "flag": "1", "name": "x"})
+
+
+def test_async_threaded_and_inline_handlers(routes):
+    routes(
+        {
+            "__init__.py": "async def get(name: str):\n    return f'hi {name}'\n",
+            "thread.py": (
+                "import threading\n\n"
+                "def get():\n    return threading.current_thread().name\n"
+            ),
+            "inline.py": (
+                "import threading\n\nINLINE = True\n\n"
+                "def get():\n    return threading.current_thread().name\n"
+            ),
+        }
+    )
+    router = Router("src/routes")
+
+    async def main():
+        return [
+            (await router.route("get", path, query)).body.body
+            for path, query in (("/", b"name=vega"), ("/thread", b""), ("/inline", b""))
+        ]
+
+    root, thread, inline = asyncio.run(main())
+    assert root == b"hi vega"
+    assert thread.startswith(b"sirius")
+    assert inline == b"MainThread"
+
+
+def test_misses_use_shared_responses(routes):
+    routes({"__init__.py": "", "items.py": "def get():\n    return 'items'\n"})
+    router = Router("src/routes")
+
+    async def main():
+        return (
+            await router.route("get", "/missing", b""),
+            await router.route("post", "/items", b""),
+            await router.route("post", "/items", b""),
+            await router.route("get", "/items", b""),
+        )
+
+    missing, not_allowed, again, ok = asyncio.run(main())
+    assert missing is NOT_FOUND
+    assert not_allowed is again
+    assert not_allowed.start.status == 405
+    assert (b"Allow", b"GET") in not_allowed.start.headers
+    start, body = ok.messages()
+    assert (b"Content-Length", b"5") in start["headers"]
+    assert body == {"type": "http.response.body", "body": b"items", "more_body": False}
+
+
+def test_lazy_router_imports_on_first_request(routes):
+    routes(
+        {
+            "__init__.py": "",
+            "a.py": "def get():\n    return 'a'\n",
+            "b.py": "def get():\n    return 'b'\n",
+        }
+    )
+    router = Router("src/routes", lazy=True)
+    assert "src.routes.a" not in sys.modules
+
+    async def main():
+        return await asyncio.gather(*(router.route("get", "/a", b"") for _ in range(5)))
+
+    assert {response.body.body for response in asyncio.run(main())} == {b"a"}
+    assert [route for route, _ in router.routes] == ["/a"]
+
+    router.warm_up().join()
+    assert "src.routes.b" in sys.modules
+
+
+def test_router_reads_fresh_manifest(routes, monkeypatch):
+    folder = routes({"__init__.py": "", "a.py": "def get(n: int):\n    return n\n"})
+    write_manifest(Router("src/routes"), "routes.json")
+    assert set(load_manifest("routes.json", "src/routes")) == {
+        ("/", "src.routes.__init__"),
+        ("/a", "src.routes.a"),
+    }
+
+    def discover(self):
+        raise AssertionError("the manifest should have been used")
+
+    monkeypatch.setattr(Router, "discover_routes", discover)
+    assert set(Router("src/routes", manifest="routes.json").module_paths) == {
+        "/",
+        "/a",
+    }
+
+    (folder / "b.py").write_text("")
+    assert load_manifest("routes.json", "src/routes") is None
+
+
+def test_manifest_stays_fresh_when_bytecode_is_written(routes, monkeypatch):
+    import compileall
+
+    folder = routes({"__init__.py": "", "a.py": "def get():\n    return 'a'\n"})
+    monkeypatch.setattr(sys, "dont_write_bytecode", True)
+    write_manifest(Router("src/routes"), "routes.json")
+
+    # Like a worker importing the routes with bytecode enabled
+    compileall.compile_dir(folder, quiet=2, force=True)
+    (folder / "__pycache__" / "b.cpython-0.pyc").write_bytes(b"")
+    assert load_manifest("routes.json", "src/routes") is not None
+
+
+def test_response_cache(routes):
+    routes(
+        {
+            "__init__.py": "",
+            "counter.py": (
+                "from sirius.routing import ResponseCache\n\n"
+                "CACHE = ResponseCache(ttl=60, max_entries=2)\n"
+                "calls = []\n\n"
+                "def get(n: int = 0):\n"
+                "    calls.append(n)\n"
+                "    return {'n': n}\n\n"
+                "def post():\n"
+                "    CACHE.invalidate()\n"
+            ),
+            "me.py": (
+                "from sirius.core import Request\n\n"
+                "CACHE_TTL = 60\n\n"
+                "async def get(request: Request):\n"
+                "    return request.header(b'authorization')\n"
+            ),
+        }
+    )
+    router = Router("src/routes")
+    calls = sys.modules["src.routes.counter"].calls
+
+    async def get(query):
+        return await router.route("get", "/counter", query)
+
+    async def main():
+        first = await get(b"n=1&x=2")
+        assert await get(b"x=2&n=1") is first
+        await get(b"n=2")
+        await get(b"n=3")
+        await get(b"n=1&x=2")
+        await router.route("post", "/counter", b"")
+        await get(b"n=3")
+
+    asyncio.run(main())
+    # n=1 was evicted by n=2 and n=3, then everything was invalidated
+    assert calls == [1, 2, 3, 1, 3]
+
+    async def me(user):
+        request = Request(
+            {"method": "GET", "path": "/me", "headers": [(b"authorization", user)]},
+            {"type": "http.request", "body": b"", "more_body": False},
+        )
+        return (await router.route("get", "/me", b"", request)).body.body
+
+    assert asyncio.run(me(b"vega")) == b"vega"
+    assert asyncio.run(me(b"deneb")) == b"deneb"
+    assert len(router.caches["/me"]) == 0
+
+
+def test_parse_query():
+    assert parse_query(b"a=1%262&b=x%3Dy&flag&a=3&name=Vega+Lyr") == {
+        "a": ["1&2", "3"],
+        "b": ["x=y"],
+        "flag": [""],
+        "name": ["Vega Lyr"],
+    }
+    assert parse_query(b"q=%E2%98%85") == {"q": ["★"]}
+    assert parse_query(b"x=1") is parse_query(b"x=1")
+
+
+def test_multi_valued_params():
+    def handler(tag: list[str], n: list[int], last: int): ...
+
+    plan = CallPlan.compile(handler)
+    raw = parse_query(b"tag=a&tag=b&n=1&n=2&last=1&last=2")
+    assert plan.bind(raw) == {"tag": ["a", "b"], "n": [1, 2], "last": 2}
+    assert plan.bind(raw)["tag"] is not raw["tag"]
+
+
+def test_coalesced_requests(routes):
+    routes(
+        {
+            "__init__.py": "",
+            "slow.py": (
+                "import asyncio\n\n"
+                "COALESCE = True\n"
+                "calls = []\n\n"
+                "async def get(n: int = 0):\n"
+                "    calls.append(n)\n"
+                "    await asyncio.sleep(0.05)\n"
+                "    if n < 0:\n"
+                "        raise ValueError(n)\n"
+                "    return {'n': n}\n"
+            ),
+            "timeout.py": (
+                "import asyncio\n\n"
+                "COALESCE = True\n"
+                "COALESCE_TIMEOUT = 0.01\n\n"
+                "async def get():\n"
+                "    await asyncio.sleep(0.1)\n"
+                "    return 'done'\n"
+            ),
+        }
+    )
+    router = Router("src/routes")
+    calls = sys.modules["src.routes.slow"].calls
+
+    async def main():
+        get = router.route
+        same = await asyncio.gather(*(get("get", "/slow", b"n=1") for _ in range(5)))
+        other = await get("get", "/slow", b"n=2")
+        failed = await asyncio.gather(
+            *(get("get", "/slow", b"n=-1") for _ in range(3)), return_exceptions=True
+        )
+        timed_out = await asyncio.gather(
+            get("get", "/timeout", b""), get("get", "/timeout", b"")
+        )
+        return same, other, failed, timed_out
+
+    same, other, failed, timed_out = asyncio.run(main())
+    assert calls == [1, 2, -1]
+    assert {response.body.body for response in same} == {b'{"n":1}'}
+    assert other.body.body == b'{"n":2}'
+    assert all(isinstance(error, ValueError) for error in failed)
+    assert [response.start.status for response in timed_out] == [200, 503]
+    assert router.flights["/slow"].coalesced == 6
+
+
+def test_route_concurrency_limit(routes):
+    routes(
+        {
+            "__init__.py": "",
+            "limited.py": (
+                "import asyncio\n\n"
+                "MAX_CONCURRENCY = 1\n"
+                "MAX_QUEUE = 1\n"
+                "QUEUE_TIMEOUT = 0.2\n"
+                "RETRY_AFTER = 3\n\n"
+                "async def get(delay: float = 0.05):\n"
+                "    await asyncio.sleep(delay)\n"
+                "    return 'ok'\n"
+            ),
+        }
+    )
+    router = Router("src/routes")
+    limiter = router.limiters["/limited"]
+
+    async def main():
+        # One runs, one queues, the third finds the queue full
+        burst = await asyncio.gather(
+            *(router.route("get", "/limited", b"") for _ in range(3))
+        )
+        # The queued request gives up before the slow one is done
+        slow = asyncio.create_task(router.route("get", "/limited", b"delay=0.5"))
+        await asyncio.sleep(0)
+        timed_out = await router.route("get", "/limited", b"")
+        await slow
+        return burst, timed_out
+
+    burst, timed_out = asyncio.run(main())
+    assert [response.start.status for response in burst] == [200, 200, 503]
+    assert (b"Retry-After", b"3") in burst[2].start.headers
+    assert timed_out.start.status == 503
+    assert (limiter.active, limiter.depth, limiter.shed) == (0, 0, 2)
+
+
+def test_dedicated_pools_are_shut_down(routes):
+    routes(
+        {
+            "__init__.py": "",
+            "pooled.py": "MAX_WORKERS = 2\n\ndef get():\n    return 'ok'\n",
+        }
+    )
+    router = Router("src/routes")
+    pool = router.pools["src.routes.pooled"]
+
+    router.reload(["src.routes.pooled"])
+    with pytest.raises(RuntimeError):
+        pool.submit(print)
+    reloaded = router.pools["src.routes.pooled"]
+    assert reloaded is not pool
+    assert asyncio.run(router.route("get", "/pooled", b"")).body.body == b"ok"
+
+    router.shutdown()
+    assert router.pools == {}
+    with pytest.raises(RuntimeError):
+        reloaded.submit(print)
@@ -1,5 +1,826 @@
+import asyncio
+import json
+import os
+import sys
+import zlib
+from types import SimpleNamespace
+
+import pytest
+
 from sirius import __version__
+from tests.conftest import call
 
 
 def test_version():
     assert __version__ == "0.1.0"
+
+
+def test_request_bodies(routes):
+    routes(
+        {
+            "__init__.py": "",
+            "stream.py": (
+                "from sirius.core import Request\n\n"
+                "async def post(request: Request):\n"
+                "    return str(sum([len(chunk) async for chunk in request.stream()]))\n"
+            ),
+            "spool.py": (
+                "from sirius.core import Request\n\n"
+                "def post(request: Request):\n"
+                "    return request.file.read().decode()\n"
+            ),
+        }
+    )
+    from sirius.config.config import Cfg, RequestConfig
+    from sirius.sirius import Sirius
+
+    app = Sirius(config=Cfg(request=RequestConfig(max_body_size=8)))
+    assert call(app, "POST", "/stream", body=b"abcdef")[1]["body"] == b"6"
+    assert call(app, "POST", "/spool", body=b"abcdef")[1]["body"] == b"abcdef"
+    assert call(app, "POST", "/spool", body=b"x" * 9)[0]["status"] == 413
+    too_long = call(app, "POST", "/", headers=[(b"Content-Length", b"100")])
+    assert too_long[0]["status"] == 413
+
+
+def test_client_disconnect_during_body(routes):
+    routes(
+        {
+            "__init__.py": "",
+            "upload.py": (
+                "from sirius.core import Request\n\n"
+                "received = []\n\n"
+                "async def post(request: Request):\n"
+                "    received.append(await request.body())\n"
+                "    return 'stored'\n"
+            ),
+        }
+    )
+    from sirius.core import Request
+    from sirius.errors import ClientDisconnect
+    from sirius.sirius import Sirius
+
+    cut_off = [
+        {"type": "http.request", "body": b"abc", "more_body": True},
+        {"type": "http.disconnect"},
+    ]
+    app = Sirius()
+    assert call(app, "POST", "/upload", messages=cut_off) == []
+    assert sys.modules["src.routes.upload"].received == []
+    assert app.metrics.route("/upload").statuses == {"4xx": 1}
+
+    async def load():
+        messages = list(cut_off)
+
+        async def receive():
+            return messages.pop(0)
+
+        await Request({"method": "POST", "path": "/"}, receive).load()
+
+    with pytest.raises(ClientDisconnect):
+        asyncio.run(load())
+
+
+def test_streaming_responses(routes):
+    routes(
+        {
+            "__init__.py": "",
+            "sync.py": "def get():\n    yield 'a'\n    yield b'b'\n",
+            "agen.py": (
+                "async def get():\n"
+                "    for i in range(3):\n"
+                "        yield f'{i}\\n'\n"
+            ),
+            "status.py": "def get():\n    return iter([b'x']), 201\n",
+        }
+    )
+    from sirius.sirius import Sirius
+
+    app = Sirius()
+    sent = call(app, path="/sync")
+    assert [m["body"] for m in sent[1:]] == [b"a", b"b", b""]
+    assert [m["more_body"] for m in sent[1:]] == [True, True, False]
+    sent = call(app, path="/agen")
+    assert b"".join(m["body"] for m in sent[1:]) == b"0\n1\n2\n"
+    assert call(app, path="/status")[0]["status"] == 201
+
+
+def test_streaming_stops_on_disconnect(routes):
+    routes(
+        {
+            "__init__.py": "",
+            "feed.py": (
+                "import asyncio\n\n"
+                "closed = []\n\n"
+                "async def get():\n"
+                "    try:\n"
+                "        while True:\n"
+                "            yield b'chunk'\n"
+                "            await asyncio.sleep(0)\n"
+                "    finally:\n"
+                "        closed.append(True)\n"
+            ),
+        }
+    )
+    from sirius.sirius import Sirius
+
+    app = Sirius()
+    sent = []
+
+    async def receive():
+        await asyncio.sleep(0.01)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/feed", "headers": []}
+    asyncio.run(asyncio.wait_for(app(scope, receive, send), 1))
+    assert sent[-1]["more_body"] is True
+    assert sys.modules["src.routes.feed"].closed == [True]
+
+
+def test_streamed_request_echoed_through_streamed_response(routes):
+    routes(
+        {
+            "__init__.py": "",
+            "echo.py": (
+                "from sirius.core import Request\n\n"
+                "async def post(request: Request):\n"
+                "    async def upper():\n"
+                "        async for chunk in request.stream():\n"
+                "            yield chunk.upper()\n\n"
+                "    return upper()\n"
+            ),
+        }
+    )
+    from sirius.sirius import Sirius
+
+    app = Sirius()
+    chunks = [b"ab", b"cd", b"ef"]
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+    sent = []
+
+    async def receive():
+        # Like a server waiting on the socket, which lets the disconnect listener run
+        await asyncio.sleep(0)
+        if messages:
+            return messages.pop(0)
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/echo", "headers": []}
+    asyncio.run(asyncio.wait_for(app(scope, receive, send), 1))
+    assert [m["body"] for m in sent[1:]] == [b"AB", b"CD", b"EF", b""]
+
+
+def test_etags_and_not_modified(routes):
+    routes(
+        {
+            "__init__.py": "def get():\n    return 'hello'\n",
+            "doc.py": (
+                "calls = []\n\n"
+                "def etag(id: int):\n    return f'v{id}'\n\n"
+                "def get(id: int):\n"
+                "    calls.append(id)\n"
+                "    return {'id': id}\n"
+            ),
+        }
+    )
+    from sirius.sirius import Sirius
+
+    app = Sirius()
+    start = call(app)[0]
+    etag = dict(start["headers"])[b"ETag"]
+    sent = call(app, headers=[(b"If-None-Match", b'W/"nope", ' + etag)])
+    assert sent[0]["status"] == 304
+    assert sent[1]["body"] == b""
+
+    assert dict(call(app, path="/doc", query=b"id=1")[0]["headers"])[b"ETag"] == b'"v1"'
+    sent = call(app, path="/doc", query=b"id=1", headers=[(b"If-None-Match", b'"v1"')])
+    assert sent[0]["status"] == 304
+    assert sys.modules["src.routes.doc"].calls == [1]
+
+
+def test_streamed_responses_are_compressed(routes):
+    routes(
+        {"__init__.py": "def get():\n    for i in range(3):\n        yield f'{i}\\n'\n"}
+    )
+    from sirius.sirius import Sirius
+
+    sent = call(Sirius(), headers=[(b"Accept-Encoding", b"gzip")])
+    assert dict(sent[0]["headers"])[b"Content-Encoding"] == b"gzip"
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    # Every chunk can be decoded as soon as it arrives
+    assert [decompressor.decompress(m["body"]) for m in sent[1:3]] == [b"0\n", b"1\n"]
+
+
+def test_metrics(routes):
+    routes(
+        {
+            "__init__.py": "",
+            "users/<id>.py": "def get(id: int):\n    return {'id': id}\n",
+            "slow.py": (
+                "import time\n\n"
+                "time.sleep(0.1)\n"
+                "MAX_CONCURRENCY = 1\n\n"
+                "def get():\n"
+                "    return 'done'\n"
+            ),
+        }
+    )
+    from sirius.config.config import Cfg, MetricsConfig, RoutingConfig
+    from sirius.sirius import Sirius
+
+    app = Sirius(
+        config=Cfg(
+            metrics=MetricsConfig(path="/metrics"),
+            routing=RoutingConfig(lazy=True, warm_up=False),
+        )
+    )
+    call(app, path="/users/1")
+    call(app, path="/users/2")
+    call(app, path="/users/x")
+    call(app, path="/missing")
+    call(app, path="/slow")
+    sent = call(app, path="/metrics")
+    assert sent[0]["status"] == 200
+    text = sent[1]["body"].decode()
+    assert 'sirius_requests_total{route="/users/<id>",status="2xx"} 2' in text
+    assert 'sirius_requests_total{route="/users/<id>",status="4xx"} 1' in text
+    assert 'sirius_requests_total{route="<unmatched>",status="4xx"} 1' in text
+    for stage in ("route", "handler", "serialize"):
+        assert (
+            f'sirius_request_duration_seconds_count{{route="/users/<id>",stage="{stage}"}} 2'
+            in text
+        )
+    assert (
+        'sirius_request_duration_seconds_bucket{route="/users/<id>",stage="total",le="+Inf"} 3'
+        in text
+    )
+    # Only limited routes wait for a slot
+    assert 'route="/users/<id>",stage="queue"' not in text
+    assert (
+        'sirius_request_duration_seconds_count{route="/slow",stage="queue"} 1' in text
+    )
+    # The lazy import of the module isn't accounted to routing
+    route_sum = app.metrics.route("/slow").stages["route"].sum
+    assert route_sum < 0.1 <= app.metrics.route("/slow").stages["total"].sum
+
+    app = Sirius(config=Cfg(metrics=MetricsConfig(enabled=False, path="/metrics")))
+    assert app.metrics is None and app.router.metrics is None
+    assert call(app, path="/metrics")[0]["status"] == 404
+
+
+def test_profiling(routes, tmp_path):
+    import pstats
+
+    routes(
+        {
+            "__init__.py": "",
+            "users/<id>.py": "async def get(id: int):\n    return {'id': id}\n",
+            "report.py": (
+                "def slow_inner():\n    return sum(range(1000))\n\n"
+                "def get():\n    return str(slow_inner())\n"
+            ),
+        }
+    )
+    from sirius.config.config import Cfg, ProfilingConfig
+    from sirius.sirius import Sirius
+
+    app = Sirius(config=Cfg(profiling=ProfilingConfig(header="X-Profile")))
+    call(app, path="/users/1")
+    assert not (tmp_path / "profiles").exists()
+    call(app, path="/users/1", headers=[(b"X-Profile", b"1")])
+    (profile,) = (tmp_path / "profiles").iterdir()
+    assert profile.name.startswith("users_id-")
+    stats = pstats.Stats(str(profile))
+    assert any(function == "get" for _, _, function in stats.stats)
+
+    # Synchronous handlers run on the executor, and are profiled there
+    call(app, path="/report", headers=[(b"X-Profile", b"1")])
+    (profile,) = (tmp_path / "profiles").glob("report-*")
+    stats = pstats.Stats(str(profile))
+    assert any(function == "slow_inner" for _, _, function in stats.stats)
+
+    assert Sirius().profiler is None
+
+
+def test_bench(tmp_path, monkeypatch):
+    import json
+
+    from sirius.config import config
+
+    # A project whose routes live elsewhere, which the benchmark must not try to load
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "sirius.toml").write_text('[routing]\npath = "app/routes"\n')
+    monkeypatch.setattr(config, "_CACHED_CONFIG", config._CACHED_CONFIG)
+    config.update_config(tmp_path / "sirius.toml")
+    # Imported afresh, like the command line does
+    for module in ("sirius.sirius", "sirius.bench"):
+        monkeypatch.delitem(sys.modules, module, raising=False)
+    from sirius import bench
+
+    results = bench.run(sizes=(4,), scenarios=tuple(bench.SCENARIOS), requests=5)
+    json.dumps(results)
+    statuses = {
+        result["scenario"]: set(result["statuses"]) for result in results["results"]
+    }
+    assert statuses == {
+        "hit_static": {"200"},
+        "hit_param": {"200"},
+        "miss": {"404"},
+        "query": {"200"},
+        "json": {"200"},
+        "body_small": {"200"},
+        "body_large": {"200"},
+    }
+    assert all(result["p99_us"] >= result["p50_us"] for result in results["results"])
+
+
+def lifespan(app, *events: str) -> list[dict]:
+    """Drive the ASGI lifespan protocol of `app` through `events`, returning what it sent."""
+    sent = []
+    messages = [{"type": f"lifespan.{event}"} for event in events]
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app({"type": "lifespan", "asgi": {"version": "3.0"}}, receive, send))
+    return sent
+
+
+def test_lifespan(routes):
+    routes(
+        {
+            "__init__.py": "",
+            "_lifespan.py": (
+                "events = []\n\n"
+                "async def startup():\n"
+                "    events.append('startup')\n"
+                "    return {'db': {'1': 'one'}}\n\n"
+                "def shutdown(db):\n"
+                "    events.append(('shutdown', db))\n"
+            ),
+            "users/<id>.py": "def get(db, id: str):\n    return db.get(id, 'none')\n",
+        }
+    )
+    from sirius.config.config import Cfg, RoutingConfig
+    from sirius.sirius import Sirius
+
+    app = Sirius(config=Cfg(routing=RoutingConfig(lazy=True)))
+    asyncio.run(app.startup())
+    assert call(app, path="/users/1")[1]["body"] == b"one"
+    # Resources can't be overridden by the client
+    assert call(app, path="/users/1", query=b"db=x")[1]["body"] == b"one"
+    asyncio.run(app.shutdown())
+    events = sys.modules["src.routes._lifespan"].events
+    assert events == ["startup", ("shutdown", {"1": "one"})]
+
+    app = Sirius(config=Cfg(routing=RoutingConfig(lazy=True, warm_up=True)))
+    sent = lifespan(app, "startup", "shutdown")
+    assert [message["type"] for message in sent] == [
+        "lifespan.startup.complete",
+        "lifespan.shutdown.complete",
+    ]
+    assert "/users/<id>" in app.router.route_map
+
+
+def test_lifespan_failure(routes):
+    routes(
+        {
+            "__init__.py": "",
+            "_lifespan.py": "def startup():\n    raise RuntimeError('no database')\n",
+        }
+    )
+    from sirius.sirius import Sirius
+
+    (sent,) = lifespan(Sirius(), "startup")
+    assert sent["type"] == "lifespan.startup.failed"
+    assert "no database" in sent["message"]
+
+
+def test_global_concurrency_limit(routes):
+    routes({"__init__.py": "", "ok.py": "async def get():\n    return 'ok'\n"})
+    from sirius.config.config import Cfg, LimitsConfig, MetricsConfig
+    from sirius.sirius import Sirius
+
+    app = Sirius(
+        config=Cfg(
+            limits=LimitsConfig(max_concurrency=1, max_queue=0, routes={"/ok": 2}),
+            metrics=MetricsConfig(path="/metrics"),
+        )
+    )
+    assert app.router.limiters["/ok"].max_concurrency == 2
+    assert call(app, path="/ok")[0]["status"] == 200
+    app.limiter.active = 1
+    assert call(app, path="/ok")[0]["status"] == 503
+    app.limiter.active = 0
+    text = call(app, path="/metrics")[1]["body"].decode()
+    assert 'sirius_limit_shed_total{limit="global"} 1' in text
+    assert 'sirius_limit_queue_depth{limit="/ok"} 0' in text
+
+
+def test_concurrency_limit_covers_streamed_bodies(routes):
+    routes(
+        {
+            "__init__.py": "",
+            "feed.py": (
+                "MAX_CONCURRENCY = 1\n\n"
+                "def get():\n"
+                "    yield 'a'\n"
+                "    yield 'b'\n"
+            ),
+        }
+    )
+    from sirius.config.config import Cfg, LimitsConfig
+    from sirius.sirius import Sirius
+
+    app = Sirius(config=Cfg(limits=LimitsConfig(max_concurrency=5)))
+    limiters = [app.limiter, app.router.limiters["/feed"]]
+    held = []
+
+    async def send(message):
+        held.append([limiter.active for limiter in limiters])
+
+    async def receive():
+        await asyncio.Event().wait()
+
+    scope = {"type": "http", "method": "GET", "path": "/feed", "headers": []}
+    asyncio.run(app(scope, receive, send))
+    # The start, the two chunks and the end of the body
+    assert held == [[1, 1]] * 4
+    assert [limiter.active for limiter in limiters] == [0, 0]
+
+
+def test_background_tasks(routes, caplog):
+    routes(
+        {
+            "__init__.py": "",
+            "signup.py": (
+                "import asyncio\n"
+                "from sirius.core import BackgroundTasks\n\n"
+                "sent = []\n\n"
+                "def send_email(to):\n"
+                "    sent.append(('email', to))\n\n"
+                "async def notify(to):\n"
+                "    await asyncio.sleep(0.01)\n"
+                "    sent.append(('notify', to))\n\n"
+                "def fail():\n"
+                "    raise RuntimeError('smtp is down')\n\n"
+                "async def post(name: str, tasks: BackgroundTasks):\n"
+                "    tasks.add(fail)\n"
+                "    tasks.add(send_email, name)\n"
+                "    tasks.add(notify, to=name)\n"
+                "    return 'welcome'\n"
+            ),
+        }
+    )
+    from sirius.sirius import Sirius
+
+    app = Sirius()
+    sent = []
+
+    async def main():
+        async def send(message):
+            sent.append(message)
+            # Nothing runs before the response is complete
+            assert not sys.modules["src.routes.signup"].sent
+
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "path": "/signup",
+            "query_string": b"name=vega",
+        }
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        await app(scope, receive, send)
+        await app.shutdown()
+
+    asyncio.run(main())
+    assert sent[1]["body"] == b"welcome"
+    for executor in (app.executor, app.tasks.executor):
+        with pytest.raises(RuntimeError):
+            executor.submit(print)
+    assert sys.modules["src.routes.signup"].sent == [
+        ("email", "vega"),
+        ("notify", "vega"),
+    ]
+    assert "smtp is down" in caplog.text
+
+
+def test_static_files(routes, tmp_path):
+    routes(
+        {
+            "__init__.py": "",
+            "report.py": (
+                "from sirius.core.files import FileResponse\n\n"
+                "def get():\n"
+                "    return FileResponse('report.csv', content_type='text/csv')\n"
+            ),
+        }
+    )
+    static = tmp_path / "src" / "static"
+    static.mkdir()
+    (static / "app.js").write_bytes(b"0123456789")
+    (tmp_path / "report.csv").write_text("a,b\n")
+    from sirius.sirius import Sirius
+
+    app = Sirius()
+    sent = call(app, path="/static/app.js")
+    headers = dict(sent[0]["headers"])
+    assert sent[0]["status"] == 200
+    assert headers[b"Content-Type"].startswith(b"text/javascript")
+    assert headers[b"Content-Length"] == b"10"
+    assert b"".join(message["body"] for message in sent[1:]) == b"0123456789"
+
+    sent = call(app, path="/static/app.js", headers=[(b"Range", b"bytes=2-4")])
+    assert sent[0]["status"] == 206
+    assert dict(sent[0]["headers"])[b"Content-Range"] == b"bytes 2-4/10"
+    assert b"".join(message["body"] for message in sent[1:]) == b"234"
+    sent = call(app, path="/static/app.js", headers=[(b"Range", b"bytes=20-")])
+    assert sent[0]["status"] == 416
+
+    for conditional in (
+        (b"If-None-Match", headers[b"ETag"]),
+        (b"If-Modified-Since", headers[b"Last-Modified"]),
+    ):
+        assert (
+            call(app, path="/static/app.js", headers=[conditional])[0]["status"] == 304
+        )
+
+    assert call(app, path="/static/../report.py")[0]["status"] == 404
+    assert call(app, path="/static/missing.js")[0]["status"] == 404
+    app.static.max_entries = 2
+    for name in ("a.js", "b.js", "c.js"):
+        call(app, path=f"/static/{name}")
+    assert list(app.static.entries) == ["b.js", "c.js"]
+
+    sent = call(app, path="/report")
+    assert dict(sent[0]["headers"])[b"Content-Type"] == b"text/csv"
+    assert b"".join(message["body"] for message in sent[1:]) == b"a,b\n"
+
+
+def test_file_pathsend(routes, tmp_path):
+    routes({"__init__.py": ""})
+    (tmp_path / "src" / "static").mkdir()
+    (tmp_path / "src" / "static" / "logo.svg").write_text("<svg/>")
+    from sirius.sirius import Sirius
+
+    app = Sirius()
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/static/logo.svg",
+        "extensions": {"http.response.pathsend": {}},
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    assert sent[1] == {
+        "type": "http.response.pathsend",
+        "path": os.path.realpath(tmp_path / "src" / "static" / "logo.svg"),
+    }
+
+
+def test_hot_reload(routes, tmp_path):
+    route_folder = routes(
+        {
+            "__init__.py": "",
+            "a.py": "def get():\n    return 'a'\n",
+            "b.py": "CACHE_TTL = 60\n\ndef get():\n    return 'b'\n",
+        }
+    )
+    (tmp_path / "src" / "shared.py").write_text("")
+    from sirius.reload import HotReloader
+    from sirius.sirius import Sirius
+
+    app = Sirius()
+    reloader = HotReloader(app, config_file=tmp_path / "sirius.toml")
+    assert call(app, path="/b")[1]["body"] == b"b"
+    cache = app.router.caches["/b"]
+
+    def edit(path, source):
+        path.write_text(source)
+        # Make sure the change is noticed even on coarse grained file systems
+        os.utime(path, ns=(0, path.stat().st_mtime_ns + 10**9))
+
+    edit(route_folder / "a.py", "def get():\n    return 'changed'\n")
+    edit(route_folder / "c.py", "def get():\n    return 'c'\n")
+    assert reloader.check() is False
+    assert call(app, path="/a")[1]["body"] == b"changed"
+    assert call(app, path="/c")[1]["body"] == b"c"
+    assert app.router.caches["/b"] is cache and len(cache) == 1
+
+    (route_folder / "c.py").unlink()
+    assert reloader.check() is False
+    assert call(app, path="/c")[0]["status"] == 404
+
+    edit(tmp_path / "src" / "shared.py", "VALUE = 1\n")
+    assert reloader.check() is True
+
+    # Shared code outside the route package counts too, virtualenvs don't
+    venv = tmp_path / "venv" / "lib"
+    venv.mkdir(parents=True)
+    (tmp_path / "venv" / "pyvenv.cfg").write_text("")
+    edit(venv / "dependency.py", "")
+    (tmp_path / "__pycache__").mkdir()
+    edit(tmp_path / "__pycache__" / "app.py", "")
+    assert reloader.check() is False
+    edit(tmp_path / "app.py", "")
+    assert reloader.check() is True
+
+
+def test_dev_server_restarts_after_crash(routes, tmp_path, monkeypatch):
+    routes({"__init__.py": ""})
+    shared = tmp_path / "src" / "shared.py"
+    shared.write_text("broken(\n")
+    from sirius import reload
+
+    exit_codes = [1, 0]
+    started = []
+
+    class Process:
+        def __init__(self, target, args):
+            self.exitcode = None
+
+        def start(self):
+            started.append(self)
+
+        def join(self):
+            self.exitcode = exit_codes[len(started) - 1]
+            if self.exitcode:
+                # Fixed while the server is down
+                shared.write_text("fixed = True\n")
+                os.utime(shared, ns=(0, shared.stat().st_mtime_ns + 10**9))
+
+    monkeypatch.setattr(
+        reload.multiprocessing,
+        "get_context",
+        lambda method: SimpleNamespace(Process=Process),
+    )
+    reload.run_dev(8000, interval=0.01)
+    assert len(started) == 2
+
+
+def test_batch(routes):
+    routes(
+        {
+            "__init__.py": "",
+            "hello.py": "def get(name: str = 'world'):\n    return f'hello {name}'\n",
+            "items/__init__.py": "",
+            "items/<id>.py": "async def get(id: int):\n    return {'id': id}\n",
+            "broken.py": "def get():\n    raise RuntimeError('boom')\n",
+            "mislabelled.py": (
+                "from sirius.core.response import Response, ResponseBody, ResponseStart\n\n"
+                "def get():\n"
+                "    return Response(\n"
+                "        ResponseStart(200, [(b'Content-Type', b'application/json')]),\n"
+                "        ResponseBody(b'not json'),\n"
+                "    )\n"
+            ),
+            "ping.py": (
+                "from sirius.core import BackgroundTasks\n\n"
+                "pinged = []\n\n"
+                "async def ping(name):\n"
+                "    pinged.append(name)\n\n"
+                "def get(name: str, tasks: BackgroundTasks):\n"
+                "    tasks.add(ping, name)\n"
+                "    return 'pong'\n"
+            ),
+        }
+    )
+    from sirius.config.config import BatchConfig, Cfg
+    from sirius.sirius import Sirius
+
+    app = Sirius(config=Cfg(batch=BatchConfig(path="/batch", max_concurrency=2)))
+    batch = [
+        {"path": "/hello"},
+        {"path": "/hello", "query": {"name": "sirius"}},
+        {"method": "get", "path": "/items/3", "query": ""},
+        {"path": "/missing"},
+        {"path": "/broken"},
+        {"path": "/mislabelled"},
+    ]
+    sent = call(app, "POST", "/batch", body=json.dumps(batch).encode())
+    assert sent[0]["status"] == 200
+    results = json.loads(sent[1]["body"])
+    assert [result["status"] for result in results] == [200, 200, 200, 404, 500, 200]
+    assert results[0]["body"] == "hello world"
+    assert results[1]["body"] == "hello sirius"
+    assert results[2]["body"] == {"id": 3}
+    assert results[2]["headers"]["Content-Type"].startswith("application/json")
+    assert results[5]["body"] == "not json"
+
+    assert call(app, path="/batch")[0]["status"] == 405
+    assert call(app, "POST", "/batch", body=b"{}")[0]["status"] == 400
+    assert call(app, "POST", "/batch", body=b"[{}]")[0]["status"] == 400
+
+    pinged = sys.modules["src.routes.ping"].pinged
+    sent = []
+
+    async def main():
+        async def send(message):
+            sent.append(message)
+            # Tasks of sub-requests wait for the batch response like any other
+            assert not pinged
+
+        body = json.dumps([{"path": "/ping", "query": {"name": n}} for n in "ab"])
+        messages = [{"type": "http.request", "body": body.encode()}]
+
+        async def receive():
+            return messages.pop(0)
+
+        await app({"type": "http", "method": "POST", "path": "/batch"}, receive, send)
+        await app.shutdown()
+
+    asyncio.run(main())
+    assert len(sent) == 2 and sorted(pinged) == ["a", "b"]
+
+
+def test_supervisor_serves_and_shuts_down(routes, monkeypatch):
+    import signal
+    import threading
+    import time
+    import urllib.request
+
+    routes({"__init__.py": "def get():\n    return 'up'\n"})
+    from sirius.config.config import ServerConfig
+    from sirius.server import Supervisor, bind_socket
+
+    sock = bind_socket("127.0.0.1", 0, 16)
+    port = sock.getsockname()[1]
+    assert sock.get_inheritable()
+    sock.close()
+
+    # Leave the test runner's signal handlers alone
+    monkeypatch.setattr(signal, "signal", lambda signum, handler: None)
+    supervisor = Supervisor(ServerConfig(host="127.0.0.1", port=port, workers=1))
+    responses = []
+
+    def client():
+        deadline = time.monotonic() + 30
+        while not responses and time.monotonic() < deadline:
+            try:
+                with urllib.request.urlopen(
+                    f"http://127.0.0.1:{port}/", timeout=1
+                ) as r:
+                    responses.append(r.read())
+            except OSError:
+                time.sleep(0.1)
+        supervisor.should_exit = True
+
+    thread = threading.Thread(target=client)
+    thread.start()
+    supervisor.run()
+    thread.join()
+    assert responses == [b"up"]
+    assert len(supervisor.processes) == 1
+    assert not supervisor.processes[0].is_alive()
+
+
+def test_supervisor_backs_off_and_gives_up(monkeypatch):
+    import signal
+    import time
+
+    from sirius.config.config import ServerConfig
+    from sirius.server import Supervisor
+
+    class Crashed:
+        def is_alive(self):
+            return False
+
+        def join(self, timeout=None):
+            pass
+
+    monkeypatch.setattr(signal, "signal", lambda signum, handler: None)
+    supervisor = Supervisor(ServerConfig(host="127.0.0.1", port=0, workers=1))
+    supervisor.poll_interval = supervisor.restart_delay = 0.01
+    spawned = []
+
+    def spawn(sock):
+        spawned.append(time.monotonic())
+        return Crashed()
+
+    monkeypatch.setattr(supervisor, "spawn", spawn)
+    supervisor.run()
+    assert supervisor.gave_up
+    assert len(spawned) == supervisor.max_failed_starts
+    # 0.01, 0.02, 0.04 and 0.08 seconds between starts
+    assert spawned[-1] - spawned[-2] >= 0.08